@@ -107,6 +107,7 @@ async function executeFusionSwap(amount) {
       secrets,
       secretHashes,
       status: "pending",
+      fills: 0,
     };
 
     // Set up monitoring
@@ -122,12 +123,20 @@ async function executeFusionSwap(amount) {
           return;
         }
 
+        if (["expired", "cancelled", "refunded"].includes(order.status)) {
+          console.log(`Order ${order.status}: ${orderHash}`);
+          clearInterval(intervalId);
+          activeOrders.get(orderHash).status = order.status;
+          return;
+        }
+
         const fillsObject = await sdk.getReadyToAcceptSecretFills(orderHash);
         if (fillsObject.fills.length > 0) {
           for (const fill of fillsObject.fills) {
             try {
               await sdk.submitSecret(orderHash, secrets[fill.idx]);
               console.log(`Secret submitted for fill ${fill.idx}`);
+              activeOrders.get(orderHash).fills += 1;
             } catch (error) {
               console.error(`Secret submission error: ${error.message}`);
             }
@@ -174,7 +183,7 @@ app.get("/order-status/:orderHash", (req, res) => {
   if (!order) {
     res.json({ status: "not_found" });
   } else {
-    res.json({ status: order.status });
+    res.json({ status: order.status, fills: order.fills });
   }
 });
 
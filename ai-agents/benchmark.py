@@ -0,0 +1,238 @@
+"""Offline load harness for BlockchainAgent.
+
+Runs the agent against an in-process EVM (eth-tester + py-evm) and stub approval,
+OpenAI and price services on localhost, drives concurrent scripted sessions and
+reports throughput, per-stage latency and RPC call counts.
+
+    pip install "eth-tester[py-evm]"
+    python benchmark.py --sessions 8 --messages 10 --approval-delay 0.5
+"""
+import os
+import io
+import re
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import tempfile
+import threading
+from collections import Counter
+from contextlib import redirect_stdout, redirect_stderr
+from concurrent.futures import ThreadPoolExecutor
+from aiohttp import web
+from web3 import Web3, EthereumTesterProvider
+
+try:
+    from eth_tester import EthereumTester, PyEVMBackend
+except ImportError:
+    print('benchmark.py needs eth-tester with the py-evm backend: pip install "eth-tester[py-evm]"')
+    sys.exit(1)
+
+RECIPIENTS = [Web3.to_checksum_address(f"0x{i:040x}") for i in range(0x1000, 0x1000 + 64)]
+
+# Each session cycles through these; {amount} and {address} vary per message so nothing is served from the intent cache
+SCRIPT = [
+    "balance",
+    "send {amount} eth to {address}",
+    "check balance of {address}",
+    "could you move {amount} ether over to {address} please",
+]
+
+class StubServices:
+    """JSON-RPC over eth-tester plus stub approval, OpenAI and price endpoints, on one local port."""
+
+    def __init__(self, approval_delay: float = 0, llm_delay: float = 0):
+        self.approval_delay = approval_delay
+        self.llm_delay = llm_delay
+        self.backend = PyEVMBackend()
+        self.provider = EthereumTesterProvider(EthereumTester(self.backend))
+        self.w3 = Web3(self.provider)
+        self.request_func = self.provider.request_func(self.w3, self.w3.middleware_onion)
+        self.rpc_calls = Counter()
+        self.approvals = {}
+        self.llm_calls = 0
+        self.loop = asyncio.new_event_loop()
+        self.port = None
+
+    @property
+    def private_key(self) -> str:
+        return self.backend.account_keys[0].to_hex()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> None:
+        started = threading.Event()
+        threading.Thread(target=self._serve, args=(started,), daemon=True).start()
+        started.wait()
+
+    def _serve(self, started: threading.Event) -> None:
+        asyncio.set_event_loop(self.loop)
+        app = web.Application()
+        app.router.add_post('/rpc', self._rpc)
+        app.router.add_post('/api/request-approval', self._request_approval)
+        app.router.add_get('/api/approval/{approval_id}', self._approval)
+        app.router.add_post('/v1/chat/completions', self._chat_completion)
+        app.router.add_get('/price', self._price)
+        runner = web.AppRunner(app, access_log=None)
+        self.loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        self.loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        started.set()
+        self.loop.run_forever()
+
+    def _call(self, request: dict) -> dict:
+        self.rpc_calls[request['method']] += 1
+        response = self.request_func(request['method'], request.get('params', []))
+        return {**json.loads(Web3.to_json(response)), 'jsonrpc': '2.0', 'id': request.get('id')}
+
+    async def _rpc(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        if isinstance(payload, list):
+            return web.json_response([self._call(item) for item in payload])
+        return web.json_response(self._call(payload))
+
+    async def _request_approval(self, request: web.Request) -> web.Response:
+        if self.approval_delay <= 0:
+            return web.json_response({'approved': True, 'used2FA': False, 'required2FA': False})
+        approval_id = str(uuid.uuid4())
+        self.approvals[approval_id] = time.monotonic() + self.approval_delay
+        return web.json_response({'pending': True, 'approvalId': approval_id})
+
+    async def _approval(self, request: web.Request) -> web.Response:
+        approval_id = request.match_info['approval_id']
+        if approval_id not in self.approvals:
+            return web.json_response({'error': 'Approval not found'}, status=404)
+        wait = float(request.query.get('wait', '0'))
+        await asyncio.sleep(max(0, min(self.approvals[approval_id] - time.monotonic(), wait)))
+        if time.monotonic() < self.approvals[approval_id]:
+            return web.json_response({'pending': True, 'approvalId': approval_id})
+        del self.approvals[approval_id]
+        return web.json_response({'approved': True, 'used2FA': False, 'required2FA': False})
+
+    async def _chat_completion(self, request: web.Request) -> web.Response:
+        self.llm_calls += 1
+        body = await request.json()
+        await asyncio.sleep(self.llm_delay)
+        message = body['messages'][-1]['content'].lower().split('\n\n(my address:')[0]
+        address = re.search(r'0x[0-9a-f]{40}', message)
+        amount = re.search(r'(\d+\.\d+|\d+) ?(?:eth|ether)', message)
+        if amount and address:
+            intent = {'operation_type': 'transfer',
+                      'parameters': {'to_address': address.group(0), 'amount': float(amount.group(1))}}
+        else:
+            intent = {'operation_type': 'balance', 'parameters': {'address': address.group(0) if address else None}}
+        if body.get('tools'):
+            finish_reason = 'tool_calls'
+            reply = {'role': 'assistant', 'content': None, 'tool_calls': [{
+                'id': f"call_{uuid.uuid4().hex}",
+                'type': 'function',
+                'function': {'name': intent['operation_type'], 'arguments': json.dumps(intent['parameters'])}
+            }]}
+        else:
+            finish_reason = 'stop'
+            reply = {'role': 'assistant', 'content': json.dumps(intent)}
+        return web.json_response({
+            'id': f"chatcmpl-{uuid.uuid4().hex}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model'),
+            'choices': [{'index': 0, 'finish_reason': finish_reason, 'message': reply}],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+        })
+
+    async def _price(self, request: web.Request) -> web.Response:
+        return web.json_response({'ethereum': {'usd': 3000.0}})
+
+def configure_environment(services: StubServices, workdir: str) -> None:
+    """Point the agent at the stubs; must run before main is imported."""
+    os.environ.update({
+        'PRIVATE_KEY': services.private_key,
+        'OPENAI_API_KEY': 'benchmark',
+        'OPENAI_BASE_URL': f"{services.url}/v1",
+        'BASE_SEPOLIA_URL': f"{services.url}/rpc",
+        'BASE_URL': f"{services.url}/rpc",
+        'APPROVAL_SERVER_URL': services.url,
+        'ETH_PRICE_URL': f"{services.url}/price",
+        'AGENTS_REGISTRY_ADDRESS': '',
+        'HISTORY_DB_PATH': os.path.join(workdir, 'history.db'),
+    })
+
+def run_session(agent, session: int, messages: int) -> None:
+    for i in range(messages):
+        template = SCRIPT[i % len(SCRIPT)]
+        agent.process_message(template.format(
+            amount=f"0.{session + 1:03d}{i + 1:03d}",
+            address=RECIPIENTS[(session * messages + i) % len(RECIPIENTS)].lower()
+        ))
+
+def wait_until_settled(agent, timeout: float) -> bool:
+    """Wait for deferred approvals and receipt tracking to drain."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        tracking = sum(network.receipt_tracker.pending_count for network in agent.networks.values())
+        if not agent.pending_approvals and not tracking:
+            return True
+        time.sleep(0.1)
+    return False
+
+def report(main, services: StubServices, agent, args, elapsed: float, settled: bool) -> None:
+    transfers = agent.transaction_history.count(tx_type='Transfer')
+    confirmed = agent.transaction_history.count(tx_type='Transfer', status='confirmed')
+    total_messages = args.sessions * args.messages
+
+    print(f"\nSessions: {args.sessions} x {args.messages} messages, approval delay {args.approval_delay}s, "
+          f"LLM delay {args.llm_delay}s")
+    print(f"Elapsed: {elapsed:.2f}s{'' if settled else ' (timed out waiting for receipts)'}")
+    print(f"Messages: {total_messages} ({total_messages / elapsed:.2f}/s)")
+    print(f"Transfers: {confirmed}/{transfers} confirmed ({confirmed / elapsed:.2f}/s)")
+    print(f"LLM calls: {services.llm_calls}")
+
+    print(f"\n{'stage':<16}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for stage, stats in main.latency_stats.snapshot().items():
+        print(f"{stage:<16}{stats['count']:>7}{stats['errors']:>8}{stats['p50_ms']:>10}"
+              f"{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+
+    print(f"\n{'rpc method':<32}{'calls':>7}")
+    for method, calls in services.rpc_calls.most_common():
+        print(f"{method:<32}{calls:>7}")
+    print(f"{'total':<32}{sum(services.rpc_calls.values()):>7}")
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description='Offline load test for BlockchainAgent')
+    parser.add_argument('--sessions', type=int, default=4, help='concurrent scripted sessions')
+    parser.add_argument('--messages', type=int, default=8, help='messages per session')
+    parser.add_argument('--approval-delay', type=float, default=0.0, help='seconds before the stub approves')
+    parser.add_argument('--llm-delay', type=float, default=0.0, help='seconds the stub OpenAI endpoint takes')
+    parser.add_argument('--timeout', type=float, default=120, help='seconds to wait for receipts afterwards')
+    parser.add_argument('--verbose', action='store_true', help="show the agent's own output")
+    args = parser.parse_args()
+
+    services = StubServices(args.approval_delay, args.llm_delay)
+    services.start()
+    workdir = tempfile.mkdtemp(prefix='agent-benchmark-')
+    configure_environment(services, workdir)
+    import main
+
+    sink = sys.stdout if args.verbose else io.StringIO()
+    with redirect_stdout(sink), redirect_stderr(sink):
+        agent = main.BlockchainAgent()
+        agent.set_network('base-sepolia')
+        services.rpc_calls.clear()
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+            for future in [pool.submit(run_session, agent, session, args.messages) for session in range(args.sessions)]:
+                future.result()
+        settled = wait_until_settled(agent, args.timeout)
+        elapsed = time.monotonic() - started
+        agent.close()
+
+    report(main, services, agent, args, elapsed, settled)
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -1,15 +1,32 @@
 import os
-from typing import Dict, List, Optional, Union
+import asyncio
+import threading
+import concurrent.futures
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
 from dotenv import load_dotenv
 from openai import OpenAI
-from web3 import Web3
+from web3 import Web3, AsyncWeb3
+from web3.exceptions import TransactionNotFound
+from web3.providers import BaseProvider
+from web3.providers.async_base import AsyncBaseProvider
+from eth_utils import to_int
+from eth_abi import encode as abi_encode, decode as abi_decode
 from eth_account import Account
 import json
+import re
+import copy
+import sqlite3
+from collections import OrderedDict, deque
+from functools import lru_cache
+from contextlib import contextmanager
+from bisect import bisect_left
 from abc import ABC, abstractmethod
 from datetime import datetime
 import time
 from colorama import init, Fore, Back, Style
-import requests
+import aiohttp
+from requests.exceptions import ConnectionError as RequestsConnectionError, ConnectTimeout
+from urllib3.exceptions import NewConnectionError
 from tqdm import tqdm
 
 # Initialize colorama for cross-platform colored output
@@ -17,43 +34,1085 @@ init()
 
 load_dotenv()
 
+# The approval server holds the request open for up to 5 minutes while a human decides
+APPROVAL_TIMEOUT = 330
+
+# Deterministic patterns for the common commands; anything else falls through to GPT
+_AMOUNT = r'(\d+(?:\.\d+)?|\.\d+)'
+_ADDRESS = r'(0x[0-9a-f]{40})'
+TRANSFER_PATTERN = re.compile(
+    rf'^(?:please )?(?:send|transfer|pay) {_AMOUNT} ?(?:eth|ether) to {_ADDRESS}(?: (slow|normal|fast))?$'
+)
+OWN_BALANCE_PATTERN = re.compile(
+    r"^(?:(?:check|show|get) )?(?:my )?(?:eth )?balance$|^what'?s my (?:eth )?balance$"
+)
+ADDRESS_BALANCE_PATTERN = re.compile(
+    rf"^(?:(?:check|show|get) )?(?:the )?(?:eth )?balance (?:of|for) {_ADDRESS}$|^what'?s the balance (?:of|for) {_ADDRESS}$"
+)
+BULK_BALANCE_PATTERN = re.compile(r'^(?:check )?balances(?: of)?((?:[ ,]+0x[0-9a-f]{40})+)$')
+FUSION_KEYWORDS = ('fusion', 'bridge usdc', 'fusion+')
+
+# The prompt never changes between calls so providers can cache it; per-request data goes in the last message
+INTENT_SYSTEM_PROMPT = """You are a blockchain operations assistant. Turn the user's request into exactly one operation.
+
+Operations:
+1. transfer - Send ETH to an address. Parameters: to_address (0x-prefixed address), amount (ETH, number).
+2. balance - Check an ETH balance. Parameters: address (0x-prefixed address), or null for the user's own balance.
+3. fusion - Bridge USDC from Base to Arbitrum using 1inch Fusion+. Parameters: amount (USDC, number).
+
+Examples:
+- "Check my balance" -> balance with address null
+- "What's the balance for 0x456..." -> balance with address "0x456..."
+- "Move 0.5 ether over to 0x123..." -> transfer with to_address "0x123..." and amount 0.5"""
+
+INTENT_JSON_FORMAT = """
+
+Respond with a JSON object only:
+{"operation_type": "transfer" | "balance" | "fusion", "parameters": {...}}"""
+
+def _intent_tool(name: str, description: str, properties: dict) -> dict:
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "strict": True,
+            "parameters": {
+                "type": "object",
+                "properties": properties,
+                "required": list(properties),
+                "additionalProperties": False
+            }
+        }
+    }
+
+INTENT_TOOLS = [
+    _intent_tool("transfer", "Send ETH to an address", {
+        "to_address": {"type": "string", "description": "0x-prefixed recipient address"},
+        "amount": {"type": "number", "description": "Amount of ETH"}
+    }),
+    _intent_tool("balance", "Check an ETH balance", {
+        "address": {"type": ["string", "null"], "description": "0x-prefixed address, or null for the user's own"}
+    }),
+    _intent_tool("fusion", "Bridge USDC from Base to Arbitrum using 1inch Fusion+", {
+        "amount": {"type": "number", "description": "Amount of USDC"}
+    })
+]
+
+# Multicall3 is deployed at the same address on Base, Base Sepolia and most EVM chains
+MULTICALL3_ADDRESS = '0xcA11bde05977b3631167028862bE2a173976CA11'
+MULTICALL3_ABI = [{
+    "inputs": [{"components": [
+        {"name": "target", "type": "address"},
+        {"name": "allowFailure", "type": "bool"},
+        {"name": "callData", "type": "bytes"}
+    ], "name": "calls", "type": "tuple[]"}],
+    "name": "aggregate3",
+    "outputs": [{"components": [
+        {"name": "success", "type": "bool"},
+        {"name": "returnData", "type": "bytes"}
+    ], "name": "returnData", "type": "tuple[]"}],
+    "stateMutability": "payable",
+    "type": "function"
+}]
+GET_ETH_BALANCE_SELECTOR = Web3.keccak(text='getEthBalance(address)')[:4]
+BALANCE_OF_SELECTOR = Web3.keccak(text='balanceOf(address)')[:4]
+DECIMALS_SELECTOR = Web3.keccak(text='decimals()')[:4]
+SYMBOL_SELECTOR = Web3.keccak(text='symbol()')[:4]
+ERC20_BALANCE_ABI = [{
+    "constant": True,
+    "inputs": [{"name": "_owner", "type": "address"}],
+    "name": "balanceOf",
+    "outputs": [{"name": "balance", "type": "uint256"}],
+    "type": "function"
+}]
+
+# hAUTH AgentsRegistry on Base Sepolia: thresholds above which a transaction needs human approval
+AGENTS_REGISTRY_ADDRESS = '0xF49bea6547314e336B82838785f5777f5ceC75DE'
+AGENTS_REGISTRY_ABI = [{
+    "inputs": [{"name": "", "type": "address"}],
+    "name": "agentConfigs",
+    "outputs": [
+        {"name": "valueThreshold", "type": "uint96"},
+        {"name": "gasThreshold", "type": "uint96"},
+        {"name": "isSetup2FA", "type": "bool"},
+        {"name": "isActive", "type": "bool"},
+        {"name": "metadata", "type": "string"},
+        {"name": "owner", "type": "address"}
+    ],
+    "stateMutability": "view",
+    "type": "function"
+}]
+# Every registry event that changes an agent's config; the agent address is the first indexed topic
+AGENTS_REGISTRY_EVENT_TOPICS = [Web3.to_hex(Web3.keccak(text=signature)) for signature in (
+    'AgentRegistered(address,address,string)',
+    'AgentConfigUpdated(address,uint256,uint256)',
+    'Agent2FAStatusChanged(address,bool)',
+    'AgentDeactivated(address)'
+)]
+
+EOA_TRANSFER_GAS = 21000
+
+# Checksumming hashes the address with keccak; the same few addresses recur on every request
+to_checksum_address = lru_cache(maxsize=4096)(Web3.to_checksum_address)
+
+COINGECKO_ETH_PRICE_URL = 'https://api.coingecko.com/api/v3/simple/price?ids=ethereum&vs_currencies=usd'
+
+class LatencyStats:
+    """Per-stage latency histograms, optionally streamed to a JSON lines file as spans finish."""
+
+    BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 300000)
+
+    def __init__(self, export_path: Optional[str] = None, window: int = 1000):
+        self.export_path = export_path
+        self.window = window
+        self._lock = threading.Lock()
+        self._stages: Dict[str, dict] = {}
+
+    @contextmanager
+    def span(self, stage: str):
+        started = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.record(stage, time.perf_counter() - started, ok)
+
+    def record(self, stage: str, seconds: float, ok: bool = True) -> None:
+        ms = seconds * 1000
+        with self._lock:
+            stats = self._stages.setdefault(stage, {
+                'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                'buckets': [0] * (len(self.BUCKETS_MS) + 1),
+                'recent': deque(maxlen=self.window)
+            })
+            stats['count'] += 1
+            stats['errors'] += not ok
+            stats['total_ms'] += ms
+            stats['max_ms'] = max(stats['max_ms'], ms)
+            stats['buckets'][bisect_left(self.BUCKETS_MS, ms)] += 1
+            stats['recent'].append(ms)
+            if self.export_path:
+                with open(self.export_path, 'a') as f:
+                    f.write(json.dumps({'time': time.time(), 'stage': stage, 'ms': round(ms, 2), 'ok': ok}) + '\n')
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Count, mean, percentiles over the recent window and bucket counts per stage."""
+        labels = [f"<={b}ms" for b in self.BUCKETS_MS] + [f">{self.BUCKETS_MS[-1]}ms"]
+        with self._lock:
+            snapshot = {}
+            for stage, stats in self._stages.items():
+                recent = sorted(stats['recent'])
+                percentile = lambda p: round(recent[min(int(len(recent) * p), len(recent) - 1)], 1)
+                snapshot[stage] = {
+                    'count': stats['count'],
+                    'errors': stats['errors'],
+                    'mean_ms': round(stats['total_ms'] / stats['count'], 1),
+                    'p50_ms': percentile(0.5),
+                    'p90_ms': percentile(0.9),
+                    'p99_ms': percentile(0.99),
+                    'max_ms': round(stats['max_ms'], 1),
+                    'buckets': {label: n for label, n in zip(labels, stats['buckets']) if n}
+                }
+            return snapshot
+
+    def export(self, path: str) -> None:
+        """Write the current snapshot as one JSON line per stage."""
+        now = time.time()
+        with open(path, 'w') as f:
+            for stage, stats in self.snapshot().items():
+                f.write(json.dumps({'time': now, 'stage': stage, **stats}) + '\n')
+
+# Shared by the agent and every operation; set LATENCY_LOG to stream each span to a file
+latency_stats = LatencyStats(os.getenv('LATENCY_LOG') or None)
+
+class NonceManager:
+    """Hands out nonces locally per account so transactions can be broadcast back-to-back."""
+
+    def __init__(self, async_w3: AsyncWeb3):
+        self.async_w3 = async_w3
+        self._next_nonce: Dict[str, int] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _lock(self, address: str) -> asyncio.Lock:
+        return self._locks.setdefault(address, asyncio.Lock())
+
+    async def prime(self, address: str) -> None:
+        """Load the account's pending nonce from the chain unless it is already tracked."""
+        async with self._lock(address):
+            if address not in self._next_nonce:
+                self._next_nonce[address] = await self.async_w3.eth.get_transaction_count(address, 'pending')
+
+    async def allocate(self, address: str) -> int:
+        await self.prime(address)
+        async with self._lock(address):
+            nonce = self._next_nonce[address]
+            self._next_nonce[address] = nonce + 1
+            return nonce
+
+    async def release(self, address: str, nonce: int) -> None:
+        """Give back a nonce whose transaction never reached the mempool."""
+        async with self._lock(address):
+            if self._next_nonce.get(address) == nonce + 1:
+                self._next_nonce[address] = nonce
+                return
+        # Later nonces are already out, so the gap can't be closed locally
+        await self.resync(address)
+
+    async def resync(self, address: str) -> int:
+        async with self._lock(address):
+            chain_nonce = await self.async_w3.eth.get_transaction_count(address, 'pending')
+            self._next_nonce[address] = chain_nonce
+            return chain_nonce
+
+class ReceiptTracker:
+    """Polls receipts for every pending transaction on a network in one shared loop."""
+
+    def __init__(self, async_w3: AsyncWeb3, poll_interval: float = 1.0, max_wait: float = 600):
+        self.async_w3 = async_w3
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+        self._pending: Dict[str, Tuple[float, Callable[[str, dict], None]]] = {}
+        # Hashes not polled yet; they may already be mined, so they don't wait for the next block
+        self._unpolled: set = set()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def track(self, tx_hash, on_update: Callable[[str, dict], None]) -> None:
+        """Start watching tx_hash; on_update(hash, fields) runs once it is mined or given up on."""
+        tx_hash = Web3.to_hex(hexstr=tx_hash) if isinstance(tx_hash, str) else Web3.to_hex(tx_hash)
+        self._pending[tx_hash] = (time.monotonic(), on_update)
+        self._unpolled.add(tx_hash)
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._poll())
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def _receipt(self, tx_hash: str):
+        try:
+            return await self.async_w3.eth.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            return None
+        except Exception as e:
+            print(f"{Fore.RED}Receipt lookup error for {tx_hash}: {str(e)}{Style.RESET_ALL}")
+            return None
+
+    async def _receipts(self, hashes: List[str]) -> List[Optional[dict]]:
+        """Receipts for hashes (None while unmined) in one JSON-RPC batch."""
+        try:
+            # Raw provider batch: web3's batch_requests raises TransactionNotFound for the whole batch
+            # as soon as one hash is unmined
+            responses = await self.async_w3.provider.make_batch_request(
+                [('eth_getTransactionReceipt', [tx_hash]) for tx_hash in hashes]
+            )
+        except (AttributeError, NotImplementedError, TypeError):
+            # Provider can't batch
+            return await asyncio.gather(*[self._receipt(tx_hash) for tx_hash in hashes])
+        except Exception as e:
+            print(f"{Fore.RED}Receipt lookup error: {str(e)}{Style.RESET_ALL}")
+            return [None] * len(hashes)
+        
+        # Raw JSON-RPC quantities are hex strings
+        quantity = lambda value: to_int(hexstr=value) if isinstance(value, str) else value
+        receipts = []
+        for tx_hash, response in zip(hashes, responses):
+            try:
+                receipt = response.get('result')
+                if response.get('error'):
+                    print(f"{Fore.RED}Receipt lookup error for {tx_hash}: {response['error']}{Style.RESET_ALL}")
+                if not receipt:
+                    receipts.append(None)
+                    continue
+                receipts.append({
+                    'status': quantity(receipt['status']),
+                    'blockNumber': quantity(receipt['blockNumber']),
+                    'gasUsed': quantity(receipt['gasUsed']),
+                    'effectiveGasPrice': quantity(receipt.get('effectiveGasPrice'))
+                })
+            except Exception as e:
+                # A malformed entry is retried on the next block like an unmined one
+                print(f"{Fore.RED}Malformed receipt for {tx_hash}: {str(e)}{Style.RESET_ALL}")
+                receipts.append(None)
+        return receipts
+
+    async def _poll(self):
+        last_block = None
+        while self._pending:
+            self._wakeup.clear()
+            try:
+                block = await self.async_w3.eth.block_number
+            except Exception as e:
+                print(f"{Fore.RED}Receipt tracker error: {str(e)}{Style.RESET_ALL}")
+                block = None
+            
+            if block is None:
+                hashes = []
+            elif block != last_block:
+                last_block = block
+                hashes = list(self._pending)
+            else:
+                # Receipts of hashes already polled can only change when a new block arrives
+                hashes = [tx_hash for tx_hash in self._unpolled if tx_hash in self._pending]
+            
+            if hashes:
+                self._unpolled.difference_update(hashes)
+                receipts = await self._receipts(hashes)
+                for tx_hash, receipt in zip(hashes, receipts):
+                    started, on_update = self._pending[tx_hash]
+                    if receipt is not None:
+                        latency_stats.record('receipt', time.monotonic() - started, receipt['status'] == 1)
+                        updates = {
+                            'status': 'confirmed' if receipt['status'] == 1 else 'failed',
+                            'block': receipt['blockNumber'],
+                            'gas_used': receipt['gasUsed'],
+                            'effective_gas_price': receipt.get('effectiveGasPrice')
+                        }
+                    elif time.monotonic() - started > self.max_wait:
+                        updates = {'status': 'timeout'}
+                    else:
+                        continue
+                    del self._pending[tx_hash]
+                    # One failing callback (history write, printing) must not stop tracking of the rest
+                    try:
+                        on_update(tx_hash, updates)
+                    except Exception as e:
+                        print(f"{Fore.RED}Receipt update error for {tx_hash}: {str(e)}{Style.RESET_ALL}")
+            
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+def _is_connect_error(e: Exception) -> bool:
+    """True when the request cannot have reached the node, so resending it elsewhere is safe."""
+    if isinstance(e, (aiohttp.ClientConnectorError, ConnectTimeout)):
+        return True
+    # requests wraps refused/unresolvable connections as ConnectionError(MaxRetryError(reason=NewConnectionError))
+    reason = getattr(e.args[0], 'reason', None) if isinstance(e, RequestsConnectionError) and e.args else None
+    return isinstance(reason, NewConnectionError)
+
+class RPCEndpointPool:
+    """Rolling latency/error stats per RPC endpoint, used to route reads and pin writes."""
+
+    # Writes and the nonce reads they depend on stay on one endpoint so its mempool view is consistent
+    WRITE_METHODS = {'eth_sendRawTransaction', 'eth_sendTransaction', 'eth_getTransactionCount'}
+    # After a timeout or read error the node may already have accepted these, so they only fail over
+    # when the connection itself could not be made
+    NON_IDEMPOTENT_METHODS = {'eth_sendRawTransaction', 'eth_sendTransaction'}
+
+    def __init__(self, urls: List[str], window: int = 50, cooldown: float = 30, max_error_rate: float = 0.5,
+                 min_samples: int = 10):
+        self.urls = list(urls)
+        self.window = window
+        self.cooldown = cooldown
+        self.max_error_rate = max_error_rate
+        # The error rate of a handful of calls is noise; hard-down endpoints hit the consecutive-failure rule
+        self.min_samples = min_samples
+        self._latency: Dict[str, Optional[float]] = {url: None for url in self.urls}
+        self._outcomes: Dict[str, deque] = {url: deque(maxlen=window) for url in self.urls}
+        self._cooldown_until: Dict[str, float] = {url: 0.0 for url in self.urls}
+        self._write_url: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _error_rate(self, url: str) -> float:
+        outcomes = self._outcomes[url]
+        return outcomes.count(False) / len(outcomes) if outcomes else 0.0
+
+    def is_healthy(self, url: str) -> bool:
+        return time.monotonic() >= self._cooldown_until[url]
+
+    def ranked(self) -> List[str]:
+        """Healthy endpoints fastest first (unmeasured ones get probed first), then the rest."""
+        with self._lock:
+            return sorted(self.urls, key=lambda url: (not self.is_healthy(url), self._latency[url] or 0.0))
+
+    def route(self, method: str) -> List[str]:
+        ranked = self.ranked()
+        if method not in self.WRITE_METHODS:
+            return ranked
+        with self._lock:
+            if self._write_url is None or not self.is_healthy(self._write_url):
+                self._write_url = ranked[0]
+            write_url = self._write_url
+        return [write_url] + [url for url in ranked if url != write_url]
+
+    def record(self, url: str, latency: Optional[float], ok: bool) -> None:
+        with self._lock:
+            self._outcomes[url].append(ok)
+            if ok:
+                # Exponentially weighted so a few slow calls don't dominate
+                previous = self._latency[url]
+                self._latency[url] = latency if previous is None else 0.8 * previous + 0.2 * latency
+                self._cooldown_until[url] = 0.0
+            elif list(self._outcomes[url])[-3:] == [False] * 3 or (
+                    len(self._outcomes[url]) >= self.min_samples and self._error_rate(url) >= self.max_error_rate):
+                self._cooldown_until[url] = time.monotonic() + self.cooldown
+                # The cooldown is the penalty; afterwards the endpoint is judged on fresh outcomes
+                self._outcomes[url].clear()
+                if self._write_url == url:
+                    self._write_url = None
+
+    def snapshot(self) -> List[dict]:
+        with self._lock:
+            return [{
+                'url': url,
+                'healthy': self.is_healthy(url),
+                'latency_ms': round(self._latency[url] * 1000, 1) if self._latency[url] is not None else None,
+                'error_rate': round(self._error_rate(url), 2),
+                'writes': url == self._write_url
+            } for url in self.urls]
+
+class PooledHTTPProvider(BaseProvider):
+    """Sync provider that sends each request to the best endpoint of an RPCEndpointPool."""
+
+    def __init__(self, pool: RPCEndpointPool):
+        super().__init__()
+        self.pool = pool
+        self._providers = {url: Web3.HTTPProvider(url) for url in pool.urls}
+
+    def _call(self, method: str, request):
+        last_error = None
+        for url in self.pool.route(method):
+            started = time.monotonic()
+            try:
+                response = request(self._providers[url])
+            except Exception as e:
+                self.pool.record(url, None, ok=False)
+                if method in self.pool.NON_IDEMPOTENT_METHODS and not _is_connect_error(e):
+                    raise
+                last_error = e
+                continue
+            self.pool.record(url, time.monotonic() - started, ok=True)
+            return response
+        raise last_error
+
+    def make_request(self, method, params):
+        return self._call(method, lambda provider: provider.make_request(method, params))
+
+    def make_batch_request(self, requests):
+        return self._call('batch', lambda provider: provider.make_batch_request(requests))
+
+    def is_connected(self, show_traceback: bool = False) -> bool:
+        try:
+            self.make_request('web3_clientVersion', [])
+            return True
+        except Exception:
+            return False
+
+class PooledAsyncHTTPProvider(AsyncBaseProvider):
+    """Async counterpart of PooledHTTPProvider; child providers keep their keep-alive sessions."""
+
+    def __init__(self, pool: RPCEndpointPool):
+        super().__init__()
+        self.pool = pool
+        self._providers = {url: AsyncWeb3.AsyncHTTPProvider(url) for url in pool.urls}
+
+    async def _call(self, method: str, request):
+        last_error = None
+        for url in self.pool.route(method):
+            started = time.monotonic()
+            try:
+                response = await request(self._providers[url])
+            except Exception as e:
+                self.pool.record(url, None, ok=False)
+                if method in self.pool.NON_IDEMPOTENT_METHODS and not _is_connect_error(e):
+                    raise
+                last_error = e
+                continue
+            self.pool.record(url, time.monotonic() - started, ok=True)
+            return response
+        raise last_error
+
+    async def make_request(self, method, params):
+        return await self._call(method, lambda provider: provider.make_request(method, params))
+
+    async def make_batch_request(self, requests):
+        return await self._call('batch', lambda provider: provider.make_batch_request(requests))
+
+    async def disconnect(self) -> None:
+        """Close the child providers' cached aiohttp sessions."""
+        for provider in self._providers.values():
+            await provider.disconnect()
+
+    async def is_connected(self, show_traceback: bool = False) -> bool:
+        try:
+            await self.make_request('web3_clientVersion', [])
+            return True
+        except Exception:
+            return False
+
+class FeeOracle:
+    """EIP-1559 fee suggestions served from a background-sampled eth_feeHistory cache."""
+
+    URGENCY_PERCENTILES = {'slow': 10, 'normal': 50, 'fast': 90}
+
+    def __init__(self, async_w3: AsyncWeb3, block_count: int = 20, interval: float = 12, idle_timeout: float = 300):
+        self.async_w3 = async_w3
+        self.block_count = block_count
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self.base_fee: Optional[int] = None
+        self.priority_fees: Dict[str, int] = {}
+        self.updated_at = 0.0
+        self._last_used = 0.0
+        self._inflight: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _sample(self) -> None:
+        percentiles = sorted(self.URGENCY_PERCENTILES.values())
+        history = await self.async_w3.eth.fee_history(self.block_count, 'latest', percentiles)
+        if not history['baseFeePerGas']:
+            raise ValueError("node returned an empty fee history")
+        # The last base fee is the one the next block will charge
+        self.base_fee = history['baseFeePerGas'][-1]
+        rewards = history.get('reward') or []
+        for urgency, percentile in self.URGENCY_PERCENTILES.items():
+            column = sorted(block[percentiles.index(percentile)] for block in rewards)
+            self.priority_fees[urgency] = column[len(column) // 2] if column else 0
+        self.updated_at = time.monotonic()
+
+    async def refresh(self) -> None:
+        # Single-flight so a burst of transfers triggers at most one eth_feeHistory
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._sample())
+        await asyncio.shield(self._inflight)
+
+    async def _run(self):
+        while time.monotonic() - self._last_used < self.idle_timeout:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"{Fore.RED}Fee oracle refresh error: {str(e)}{Style.RESET_ALL}")
+
+    async def suggest(self, urgency: str = 'normal') -> Tuple[int, int]:
+        """Return (maxFeePerGas, maxPriorityFeePerGas) for the given urgency."""
+        if urgency not in self.URGENCY_PERCENTILES:
+            raise ValueError(f"Unknown fee urgency {urgency}. Use one of: {list(self.URGENCY_PERCENTILES)}")
+        self._last_used = time.monotonic()
+        # Sampling stops after idle_timeout without transfers and restarts on the next one
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+        
+        # Older than two sampling intervals means the sampler is idle or failing; a stale base fee can leave
+        # the 2 * base fee cap too low and stall every pipelined nonce behind it
+        if self.base_fee is None or time.monotonic() - self.updated_at > 2 * self.interval:
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"{Fore.YELLOW}Fee history unavailable, using eth_maxPriorityFeePerGas: {str(e)}{Style.RESET_ALL}")
+                max_priority_fee = await self.async_w3.eth.max_priority_fee
+                return 2 * max_priority_fee, max_priority_fee
+        
+        max_priority_fee = self.priority_fees[urgency]
+        # Headroom for the base fee to double before inclusion, as wallets commonly do
+        return 2 * self.base_fee + max_priority_fee, max_priority_fee
+
+class CodeCache:
+    """Remembers which addresses hold code, so plain ETH transfers to EOAs can skip eth_estimateGas."""
+
+    def __init__(self, ttl: float = 600, max_size: int = 4096):
+        # An EOA can gain code (CREATE2 deployment, EIP-7702 delegation), so entries expire
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+
+    async def is_contract(self, address: str, reads: 'ReadContext') -> bool:
+        entry = self._entries.get(address)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            self._entries.move_to_end(address)
+            return entry[0]
+        
+        is_contract = len(await reads.get_code(address)) > 0
+        self._entries[address] = (is_contract, time.monotonic())
+        self._entries.move_to_end(address)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return is_contract
+
 class BlockchainNetwork:
-    def __init__(self, network_name: str, rpc_url: str, chain_id: int):
+    def __init__(self, network_name: str, rpc_url: Union[str, List[str]], chain_id: int):
         self.network_name = network_name
-        self.rpc_url = rpc_url
+        # Accept a single URL, a list, or a comma-separated list of fallback endpoints
+        self.rpc_urls = [u.strip() for u in rpc_url.split(',')] if isinstance(rpc_url, str) else list(rpc_url)
+        self.rpc_url = self.rpc_urls[0]
         self.chain_id = chain_id
-        print(f"{Fore.CYAN}Connecting to {network_name}...{Style.RESET_ALL}")
-        self.w3 = Web3(Web3.HTTPProvider(rpc_url))
+        # Node-reported chain id, fetched once (single-flight); it cannot change for a network's lifetime
+        self._rpc_chain_id: Optional[asyncio.Future] = None
+        # Construction does no I/O; connectivity is checked by probe() in the background
+        self.healthy: Optional[bool] = None
+        self.probe_latency: Optional[float] = None
+        # Sync and async providers share one pool so both route on the same latency stats
+        self.endpoint_pool = RPCEndpointPool(self.rpc_urls)
+        self.w3 = Web3(PooledHTTPProvider(self.endpoint_pool))
+        # Async provider used by operations so independent RPC calls can run concurrently
+        self.async_w3 = AsyncWeb3(PooledAsyncHTTPProvider(self.endpoint_pool))
+        self.nonce_manager = NonceManager(self.async_w3)
+        self.receipt_tracker = ReceiptTracker(self.async_w3)
+        self.fee_oracle = FeeOracle(self.async_w3)
+        self.code_cache = CodeCache(float(os.getenv('CODE_CACHE_TTL', '600')))
+
+    async def probe(self, timeout: float = 5) -> bool:
+        """Check connectivity without blocking anything else; result is kept in self.healthy."""
+        started = time.monotonic()
+        try:
+            self.healthy = await asyncio.wait_for(self.async_w3.is_connected(), timeout)
+        except asyncio.TimeoutError:
+            self.healthy = False
+        self.probe_latency = time.monotonic() - started
+        return self.healthy
+
+    async def _fetch_chain_id(self) -> int:
+        rpc_chain_id = await self.async_w3.eth.chain_id
+        if rpc_chain_id != self.chain_id:
+            print(f"{Fore.YELLOW}{self.network_name} node reports chain id {rpc_chain_id}, "
+                  f"configured {self.chain_id}; signing for {rpc_chain_id}{Style.RESET_ALL}")
+        return rpc_chain_id
+
+    async def rpc_chain_id(self) -> int:
+        """Chain id to sign with, as reported by the node on first use."""
+        # A failed lookup is retried by the next caller
+        if self._rpc_chain_id is None or (self._rpc_chain_id.done() and (
+                self._rpc_chain_id.cancelled() or self._rpc_chain_id.exception() is not None)):
+            self._rpc_chain_id = asyncio.ensure_future(self._fetch_chain_id())
+        return await asyncio.shield(self._rpc_chain_id)
+
+    def health(self) -> dict:
+        return {
+            'healthy': self.healthy,
+            'probe_latency_ms': round(self.probe_latency * 1000, 1) if self.probe_latency is not None else None,
+            'endpoints': self.endpoint_pool.snapshot()
+        }
+
+async def _post_json(url: str, payload: dict, timeout: Optional[float] = None) -> Tuple[int, dict]:
+    """POST a JSON payload and return (status, parsed body)."""
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    async with aiohttp.ClientSession(timeout=client_timeout) as session:
+        async with session.post(url, json=payload) as response:
+            return response.status, await response.json(content_type=None)
+
+async def _get_json(url: str, timeout: Optional[float] = None) -> Tuple[int, dict]:
+    """GET a URL and return (status, parsed body)."""
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    async with aiohttp.ClientSession(timeout=client_timeout) as session:
+        async with session.get(url) as response:
+            return response.status, await response.json(content_type=None)
+
+class PendingApproval:
+    """Handle for an approval request; wait() resolves to the server's decision."""
+
+    def __init__(self, client: 'ApprovalClient', approval_id: Optional[str] = None, decision: Optional[dict] = None,
+                 description: str = ''):
+        self.client = client
+        self.approval_id = approval_id
+        self.description = description
+        self.created = time.monotonic()
+        self._decision = decision
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> bool:
+        return self._decision is None
+
+    async def wait(self) -> dict:
+        if self._decision is None:
+            # Share one long-poll between every waiter
+            if self._task is None:
+                self._task = asyncio.ensure_future(self.client.poll(self))
+            self._decision = await asyncio.shield(self._task)
+        return self._decision
+
+class ApprovalClient:
+    """Registers approval requests without waiting and long-polls the approval server for decisions."""
+
+    def __init__(self, base_url: str = 'http://localhost:3000', poll_wait: int = 25, timeout: float = APPROVAL_TIMEOUT):
+        self.base_url = base_url.rstrip('/')
+        self.poll_wait = poll_wait
+        self.timeout = timeout
+        # Set by the agent to skip the server round trip for transactions under its registry thresholds
+        self.agent_config: Optional[AgentConfigCache] = None
+
+    async def below_threshold(self, agent_address: str, value: int, gas_price: int) -> bool:
+        if self.agent_config is None or self.agent_config.agent_address != agent_address:
+            return False
+        return await self.agent_config.needs_approval(value, gas_price) is False
+
+    async def request(self, path: str, payload: dict, description: str = '') -> PendingApproval:
+        """Register an approval request; the returned handle is already resolved if no human is needed."""
+        status, result = await _post_json(f"{self.base_url}{path}", {**payload, 'async': True}, timeout=30)
+        if status != 200:
+            raise Exception(f"Approval request failed: {result.get('details') or result.get('error')}")
+        if result.get('pending'):
+            return PendingApproval(self, result['approvalId'], description=description)
+        return PendingApproval(self, decision=result, description=description)
+
+    async def poll(self, approval: PendingApproval) -> dict:
+        """Long-poll until the decision arrives; connection errors are retried against the same approval id."""
+        url = f"{self.base_url}/api/approval/{approval.approval_id}?wait={self.poll_wait}"
+        while time.monotonic() - approval.created < self.timeout:
+            try:
+                status, result = await _get_json(url, timeout=self.poll_wait + 10)
+            except Exception as e:
+                print(f"{Fore.YELLOW}Approval poll error for {approval.approval_id}: {str(e)}; retrying{Style.RESET_ALL}")
+                await asyncio.sleep(2)
+                continue
+            if status == 404:
+                return {'approved': False, 'reason': 'Approval not found'}
+            if not result.get('pending'):
+                return result
+        return {'approved': False, 'reason': 'Approval timeout'}
+
+class AgentConfigCache:
+    """Caches this agent's AgentsRegistry config, dropping it when a registry event for the agent shows up."""
+
+    def __init__(self, async_w3: AsyncWeb3, agent_address: str, registry_address: str = AGENTS_REGISTRY_ADDRESS,
+                 poll_interval: float = 12, reconcile_interval: float = 600, max_log_range: int = 2000):
+        self.async_w3 = async_w3
+        self.agent_address = agent_address
+        self.registry_address = to_checksum_address(registry_address)
+        self.contract = async_w3.eth.contract(address=self.registry_address, abi=AGENTS_REGISTRY_ABI)
+        self.poll_interval = poll_interval
+        self.reconcile_interval = reconcile_interval
+        self.max_log_range = max_log_range
+        self._agent_topic = '0x' + '0' * 24 + agent_address[2:].lower()
+        self._config: Optional[dict] = None
+        self._loaded_at = 0.0
+        self._last_block: Optional[int] = None
+        self._loading: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def get(self) -> dict:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._watch())
+        if self._config is not None:
+            return self._config
+        if self._loading is None or self._loading.done():
+            self._loading = asyncio.ensure_future(self._load())
+        return await asyncio.shield(self._loading)
+
+    def invalidate(self) -> None:
+        self._config = None
+
+    async def _load(self) -> dict:
+        # Read at a known block so events from the next block onwards are never missed
+        block = await self.async_w3.eth.block_number
+        value_threshold, gas_threshold, is_setup_2fa, is_active, _, owner = \
+            await self.contract.functions.agentConfigs(self.agent_address).call(block_identifier=block)
+        self._config = {
+            'valueThreshold': value_threshold,
+            'gasThreshold': gas_threshold,
+            'isSetup2FA': is_setup_2fa,
+            'isActive': is_active,
+            'owner': owner
+        }
+        self._loaded_at = time.monotonic()
+        self._last_block = block
+        return self._config
+
+    async def _changed_since(self, from_block: int, to_block: int) -> bool:
+        if to_block - from_block > self.max_log_range:
+            return True
+        logs = await self.async_w3.eth.get_logs({
+            'address': self.registry_address,
+            'fromBlock': from_block,
+            'toBlock': to_block,
+            'topics': [AGENTS_REGISTRY_EVENT_TOPICS, self._agent_topic]
+        })
+        return bool(logs)
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if self._config is None:
+                continue
+            try:
+                latest = await self.async_w3.eth.block_number
+                changed = latest > self._last_block and await self._changed_since(self._last_block + 1, latest)
+                if changed or time.monotonic() - self._loaded_at > self.reconcile_interval:
+                    self.invalidate()
+                else:
+                    self._last_block = max(self._last_block, latest)
+            except Exception as e:
+                # Without the event feed the cache can't be trusted
+                print(f"{Fore.YELLOW}Registry watch error: {str(e)}{Style.RESET_ALL}")
+                self.invalidate()
+
+    async def needs_approval(self, value: int, gas_price: int) -> Optional[bool]:
+        """Mirror AgentsRegistry.checkTransactionApproval locally; None when the server should decide."""
+        try:
+            config = await self.get()
+        except Exception as e:
+            print(f"{Fore.YELLOW}Registry config unavailable: {str(e)}{Style.RESET_ALL}")
+            return None
+        if not config['isActive']:
+            return None
+        return value > config['valueThreshold'] or gas_price > config['gasThreshold']
+
+# Shared by every operation so approvals for concurrent transactions are polled side by side
+approval_client = ApprovalClient(os.getenv('APPROVAL_SERVER_URL', 'http://localhost:3000'))
+
+class FusionOrderTracker:
+    """Polls the Fusion+ service for every pending order, backing off while an order's status is unchanged."""
+
+    TERMINAL_STATUSES = ('completed', 'expired', 'cancelled', 'refunded', 'not_found')
+
+    def __init__(self, service_url: str = 'http://localhost:3001', initial_interval: float = 5,
+                 max_interval: float = 120, max_wait: float = 7200, timeout: float = 10):
+        self.service_url = service_url.rstrip('/')
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.max_wait = max_wait
+        self.timeout = timeout
+        # order hash -> [started, next check, interval, last seen (status, fills), on_update]
+        self._pending: Dict[str, list] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def track(self, order_hash: str, on_update: Callable[[str, dict], None], status: str = 'pending',
+                    fills: Optional[int] = None) -> None:
+        """Start watching order_hash; on_update(hash, fields) runs on every status or fill count change."""
+        now = time.monotonic()
+        self._pending[order_hash] = [now, now, self.initial_interval, (status, fills), on_update]
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._poll())
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    async def _status(self, order_hash: str) -> Optional[dict]:
+        try:
+            status, body = await _get_json(f"{self.service_url}/order-status/{order_hash}", self.timeout)
+            return body if status == 200 else None
+        except Exception as e:
+            print(f"{Fore.RED}Fusion+ status lookup error for {order_hash}: {str(e)}{Style.RESET_ALL}")
+            return None
+
+    async def _check(self, order_hash: str) -> None:
+        result = await self._status(order_hash)
+        started, _, interval, last_seen, on_update = self._pending[order_hash]
+        now = time.monotonic()
+        status = result.get('status') if result else None
+        fills = result.get('fills') if result else None
         
-        if self.w3.is_connected():
-            print(f"{Fore.GREEN}✓ Connected to {network_name}{Style.RESET_ALL}")
+        if status in self.TERMINAL_STATUSES:
+            del self._pending[order_hash]
+        elif now - started > self.max_wait:
+            del self._pending[order_hash]
+            result, status = {}, 'timeout'
+        elif status is not None and (status, fills) != last_seen:
+            # Progress was made (a new status or another partial fill); look again soon
+            self._pending[order_hash][1:4] = [now + self.initial_interval, self.initial_interval, (status, fills)]
         else:
-            print(f"{Fore.RED}✗ Failed to connect to {network_name}{Style.RESET_ALL}")
+            interval = min(interval * 2, self.max_interval)
+            self._pending[order_hash][1:3] = [now + interval, interval]
+            return
+        
+        updates = {'status': status}
+        if result.get('fills') is not None:
+            updates['fills'] = result['fills']
+        try:
+            on_update(order_hash, updates)
+        except Exception as e:
+            print(f"{Fore.RED}Fusion+ update error for {order_hash}: {str(e)}{Style.RESET_ALL}")
+
+    async def _safe_check(self, order_hash: str) -> None:
+        """_check that never ends the shared poll loop; an unexpected error backs the order off instead."""
+        try:
+            await self._check(order_hash)
+        except Exception as e:
+            print(f"{Fore.RED}Fusion+ status check error for {order_hash}: {str(e)}{Style.RESET_ALL}")
+            entry = self._pending.get(order_hash)
+            if entry:
+                entry[2] = min(entry[2] * 2, self.max_interval)
+                entry[1] = time.monotonic() + entry[2]
+
+    async def _poll(self):
+        while self._pending:
+            now = time.monotonic()
+            due = [order_hash for order_hash, entry in self._pending.items() if entry[1] <= now]
+            await asyncio.gather(*[self._safe_check(order_hash) for order_hash in due])
+            if not self._pending:
+                break
+            
+            # Sleep until the next order is due, or until a new order is tracked
+            self._wakeup.clear()
+            delay = min(entry[1] for entry in self._pending.values()) - time.monotonic()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(delay, 0))
+            except asyncio.TimeoutError:
+                pass
+
+class ReadContext:
+    """Memoizes chain reads for one user request so each RPC happens at most once."""
+
+    def __init__(self, network: 'BlockchainNetwork', pin_block: bool = False):
+        self.network = network
+        self.async_w3 = network.async_w3
+        # Pinning makes every state read in the request see the same block
+        self.pin_block = pin_block
+        self._memo: Dict[tuple, asyncio.Future] = {}
+
+    async def _cached(self, key: tuple, factory: Callable[[], Awaitable]):
+        future = self._memo.get(key)
+        if future is None:
+            future = self._memo[key] = asyncio.ensure_future(factory())
+
+            def forget_failure(done: asyncio.Future):
+                # Failed reads are not memoized so a retry in the same request can succeed
+                if done.cancelled() or done.exception() is not None:
+                    self._memo.pop(key, None)
+            future.add_done_callback(forget_failure)
+        return await asyncio.shield(future)
+
+    async def block_identifier(self):
+        if not self.pin_block:
+            return 'latest'
+        return await self._cached(('block_number',), lambda: self.async_w3.eth.block_number)
+
+    async def get_balance(self, address: str) -> int:
+        block = await self.block_identifier()
+        return await self._cached(('balance', address, block), lambda: self.async_w3.eth.get_balance(address, block))
+
+    async def get_code(self, address: str) -> bytes:
+        block = await self.block_identifier()
+        return await self._cached(('code', address, block), lambda: self.async_w3.eth.get_code(address, block))
+
+    async def get_transaction_count(self, address: str) -> int:
+        # Nonces always come from the pending state, never a pinned block
+        return await self._cached(('nonce', address), lambda: self.async_w3.eth.get_transaction_count(address, 'pending'))
+
+    async def chain_id(self) -> int:
+        return await self.network.rpc_chain_id()
+
+class SignerPool:
+    """Accounts that can send transfers; each transfer goes to the least-busy account that can fund it."""
+
+    def __init__(self, accounts: List, gas_reserve: int = 0):
+        # The first account is the agent registered with hAUTH
+        self.accounts = list({account.address: account for account in accounts}.values())
+        self.gas_reserve = gas_reserve
+        # Unconfirmed transactions and the wei they will spend, per account
+        self.in_flight = {account.address: 0 for account in self.accounts}
+        self.committed = {account.address: 0 for account in self.accounts}
+
+    @classmethod
+    def from_env(cls, primary_key: str) -> 'SignerPool':
+        """PRIVATE_KEY plus SIGNER_KEYS, keystore files in SIGNER_KEYSTORE_DIR and SIGNER_TEE_COUNT derived keys."""
+        accounts = [Account.from_key(primary_key)]
+        accounts += [Account.from_key(key.strip()) for key in os.getenv('SIGNER_KEYS', '').split(',') if key.strip()]
+        
+        keystore_dir = os.getenv('SIGNER_KEYSTORE_DIR')
+        if keystore_dir:
+            password = os.getenv('SIGNER_KEYSTORE_PASSWORD', '')
+            for name in sorted(os.listdir(keystore_dir)):
+                with open(os.path.join(keystore_dir, name)) as f:
+                    accounts.append(Account.from_key(Account.decrypt(json.load(f), password)))
+        
+        tee_count = int(os.getenv('SIGNER_TEE_COUNT', '0'))
+        if tee_count:
+            accounts += asyncio.run(cls._derive_tee_accounts(tee_count))
+        
+        gas_reserve = Web3.to_wei(os.getenv('SIGNER_GAS_RESERVE', '0'), 'ether')
+        return cls(accounts, gas_reserve)
+
+    @staticmethod
+    async def _derive_tee_accounts(count: int) -> List:
+        # Only available inside a dstack TEE deployment
+        from dstack_sdk import AsyncTappdClient
+        client = AsyncTappdClient()
+        keys = await asyncio.gather(*[client.derive_key(f'/signers/{i}', 'signer') for i in range(count)])
+        return [Account.from_key(key.toBytes(32)) for key in keys]
+
+    @property
+    def primary(self):
+        return self.accounts[0]
+
+    def get(self, address: str):
+        return next(account for account in self.accounts if account.address == to_checksum_address(address))
+
+    async def available(self, reads: 'ReadContext') -> Dict[str, int]:
+        """Spendable wei per account: chain balance minus what unconfirmed transfers will spend."""
+        balances = await asyncio.gather(*[reads.get_balance(account.address) for account in self.accounts])
+        return {account.address: balance - self.committed[account.address]
+                for account, balance in zip(self.accounts, balances)}
+
+    async def select(self, reads: 'ReadContext', value: int, address: Optional[str] = None):
+        """The least-busy account that can fund value plus the gas reserve, or None."""
+        available = await self.available(reads)
+        funded = [account for account in self.accounts
+                  if available[account.address] >= value + self.gas_reserve
+                  and (address is None or account.address == to_checksum_address(address))]
+        if not funded:
+            return None
+        return min(funded, key=lambda account: (self.in_flight[account.address], -available[account.address]))
+
+    async def acquire(self, reads: 'ReadContext', value: int, count: int = 1, address: Optional[str] = None):
+        """Select an account and reserve value for count transactions until release()."""
+        account = await self.select(reads, value, address)
+        if account is not None:
+            self.in_flight[account.address] += count
+            self.committed[account.address] += value
+        return account
+
+    def release(self, address: str, value: int) -> None:
+        self.in_flight[address] = max(self.in_flight[address] - 1, 0)
+        self.committed[address] = max(self.committed[address] - value, 0)
+
+    def rebalance_plan(self, available: Dict[str, int], min_balance: int, target: int) -> List[Tuple[str, str, int]]:
+        """(from, to, wei) top-ups that lift every account below min_balance to target from the richest accounts."""
+        surplus = {address: wei - target for address, wei in available.items() if wei > target}
+        plan = []
+        for address, wei in sorted(available.items(), key=lambda item: item[1]):
+            needed = target - wei
+            if wei >= min_balance:
+                break
+            for donor in sorted(surplus, key=surplus.get, reverse=True):
+                amount = min(needed, surplus[donor])
+                if amount <= 0:
+                    break
+                plan.append((donor, address, amount))
+                surplus[donor] -= amount
+                needed -= amount
+        return plan
 
 class Operation(ABC):
-    def __init__(self, blockchain_network: BlockchainNetwork):
+    def __init__(self, blockchain_network: BlockchainNetwork, read_context: Optional[ReadContext] = None):
+        # Sync instance is kept for pure helpers (checksum, unit conversion)
         self.w3 = blockchain_network.w3
+        self.async_w3 = blockchain_network.async_w3
+        self.nonce_manager = blockchain_network.nonce_manager
+        self.fee_oracle = blockchain_network.fee_oracle
+        self.code_cache = blockchain_network.code_cache
+        if read_context is None or read_context.network is not blockchain_network:
+            read_context = ReadContext(blockchain_network)
+        self.reads = read_context
 
     @abstractmethod
-    def execute(self, *args, **kwargs):
+    async def execute(self, *args, **kwargs):
         pass
 
     @abstractmethod
-    def validate(self, *args, **kwargs) -> bool:
+    async def validate(self, *args, **kwargs) -> bool:
         pass
 
 class TransferOperation(Operation):
-    def validate(self, from_address: str, to_address: str, amount: float) -> bool:
+    async def validate(self, from_address: str, to_address: str, amount: float) -> bool:
         try:
             # Convert addresses to checksum format
-            from_checksum = self.w3.to_checksum_address(from_address)
-            to_checksum = self.w3.to_checksum_address(to_address)
+            from_checksum = to_checksum_address(from_address)
+            to_checksum = to_checksum_address(to_address)
             
             if not self.w3.is_address(from_checksum) or not self.w3.is_address(to_checksum):
                 print(f"{Fore.YELLOW}Invalid address format{Style.RESET_ALL}")
                 return False
             
-            balance = self.w3.eth.get_balance(from_checksum)
+            balance = await self.reads.get_balance(from_checksum)
             wei_amount = self.w3.to_wei(amount, 'ether')
             
             return balance >= wei_amount
@@ -61,11 +1120,16 @@ class TransferOperation(Operation):
             print(f"{Fore.RED}Validation error: {str(e)}{Style.RESET_ALL}")
             return False
 
-    def request_approval(self, from_address: str, to_address: str, value: int, gas_price: int) -> dict:
+    async def request_approval(self, from_address: str, to_address: str, value: int, gas_price: int,
+                               on_pending: Optional[Callable[[PendingApproval], None]] = None,
+                               recipients: Optional[List[Tuple[str, int]]] = None) -> dict:
         try:
+            if await approval_client.below_threshold(from_address, value, gas_price):
+                print(f"{Fore.GREEN}Below approval thresholds; no approval needed{Style.RESET_ALL}")
+                return {'approved': True, 'used2FA': False, 'required2FA': False}
+            
             print(f"{Fore.CYAN}Requesting transaction approval...{Style.RESET_ALL}")
             
-            url = "http://localhost:3000/api/request-approval"
             payload = {
                 "agentAddress": from_address,
                 "transaction": {
@@ -74,9 +1138,19 @@ class TransferOperation(Operation):
                     "gasPrice": str(gas_price)
                 }
             }
+            if recipients:
+                # Batches list every (to, value) so the approver sees where the total goes
+                payload["transaction"]["recipients"] = [{"to": to, "value": str(wei)} for to, wei in recipients]
 
-            response = requests.post(url, json=payload)
-            result = response.json()
+            with latency_stats.span('approval_wait'):
+                approval = await approval_client.request(
+                    '/api/request-approval', payload, f"{self.w3.from_wei(value, 'ether')} ETH to {to_address}"
+                )
+                if approval.pending:
+                    print(f"{Fore.CYAN}Waiting for a human decision on approval {approval.approval_id}...{Style.RESET_ALL}")
+                    if on_pending:
+                        on_pending(approval)
+                result = await approval.wait()
             
             # Enhanced response handling with 2FA status
             if result.get("approved"):
@@ -99,81 +1173,190 @@ class TransferOperation(Operation):
             print(f"{Fore.RED}Approval request error: {str(e)}{Style.RESET_ALL}")
             raise
 
-    def execute(self, from_address: str, to_address: str, amount: float, private_key: str):
+    async def execute(self, from_address: str, to_address: str, amount: float, private_key: str,
+                      urgency: str = 'normal', on_pending: Optional[Callable[[PendingApproval], None]] = None,
+                      agent_address: Optional[str] = None):
         try:
             # Convert addresses to checksum format
-            from_checksum = self.w3.to_checksum_address(from_address)
-            to_checksum = self.w3.to_checksum_address(to_address)
-            
-            nonce = self.w3.eth.get_transaction_count(from_checksum)
+            from_checksum = to_checksum_address(from_address)
+            to_checksum = to_checksum_address(to_address)
             wei_amount = self.w3.to_wei(amount, 'ether')
             
-            max_priority_fee = self.w3.eth.max_priority_fee
-            max_fee = 2 * max_priority_fee
+            print(f"{Fore.CYAN}Preparing transaction...{Style.RESET_ALL}")
+            
+            # None of these reads depend on each other, so fetch them in one round trip
+            with latency_stats.span('gas_estimation'):
+                _, (max_fee, max_priority_fee), chain_id, gas_limit = await asyncio.gather(
+                    self.nonce_manager.prime(from_checksum),
+                    self.fee_oracle.suggest(urgency),
+                    self.reads.chain_id(),
+                    self.gas_limit(from_checksum, to_checksum, wei_amount)
+                )
             
             transaction = {
                 'from': from_checksum,
                 'to': to_checksum,
                 'value': wei_amount,
-                'nonce': nonce,
-                'gas': 21000,
+                'gas': gas_limit,
                 'maxFeePerGas': max_fee,
                 'maxPriorityFeePerGas': max_priority_fee,
-                'chainId': self.w3.eth.chain_id,
+                'chainId': chain_id,
                 'type': 2
             }
             
-            print(f"{Fore.CYAN}Preparing transaction...{Style.RESET_ALL}")
-            
-            estimated_gas = self.w3.eth.estimate_gas({
-                'from': from_checksum,
-                'to': to_checksum,
-                'value': wei_amount
-            })
-            transaction['gas'] = int(estimated_gas * 1.2)
-            
             # Request approval before proceeding with transaction
-            approval_result = self.request_approval(
-                from_checksum, 
+            # Pool signers act for the registered agent, so approval is asked in its name
+            approval_result = await self.request_approval(
+                agent_address or from_checksum,
                 to_checksum,
                 wei_amount,
-                max_fee
+                max_fee,
+                on_pending
             )
             
-            if not approval_result.get("approved"):
-                if approval_result.get("reason") == "Approval timeout":
-                    raise Exception("Transaction timed out waiting for approval")
-                raise Exception("Transaction rejected by approval server")
+            self._check_approval(approval_result)
+            
+            # Confirmation is followed by the network's ReceiptTracker, not awaited here
+            return await self.sign_and_send(transaction, private_key)
+        except Exception as e:
+            print(f"{Fore.RED}Execution error: {str(e)}{Style.RESET_ALL}")
+            raise
+
+    async def gas_limit(self, from_address: str, to_address: str, value: int) -> int:
+        """A plain ETH transfer to an EOA always costs 21000 gas; only contract recipients need an estimate."""
+        if not await self.code_cache.is_contract(to_address, self.reads):
+            return EOA_TRANSFER_GAS
+        estimated_gas = await self.async_w3.eth.estimate_gas({'from': from_address, 'to': to_address, 'value': value})
+        return int(estimated_gas * 1.2)
+
+    def _check_approval(self, approval_result: dict) -> None:
+        if not approval_result.get("approved"):
+            if approval_result.get("reason") == "Approval timeout":
+                raise Exception("Transaction timed out waiting for approval")
+            raise Exception("Transaction rejected by approval server")
+        
+        # Add security recommendation if 2FA is not being used
+        if approval_result.get("required2FA") and not approval_result.get("used2FA"):
+            print(f"\n{Fore.YELLOW}Security Recommendation:{Style.RESET_ALL}")
+            print("• 2FA is enabled but was not used for this approval")
+            print("• Consider using 2FA for enhanced security on high-value transactions")
+            print("• You can configure 2FA settings in the Telegram bot")
+
+    async def sign_and_send(self, transaction: dict, private_key: str):
+        """Assign a locally allocated nonce, sign and broadcast without waiting for the receipt."""
+        sender = transaction['from']
+        for attempt in range(2):
+            nonce = await self.nonce_manager.allocate(sender)
+            with latency_stats.span('signing'):
+                signed = self.async_w3.eth.account.sign_transaction({**transaction, 'nonce': nonce}, private_key)
+            try:
+                with latency_stats.span('broadcast'):
+                    return await self.async_w3.eth.send_raw_transaction(signed.raw_transaction)
+            except Exception as e:
+                if 'already known' in str(e).lower() or 'known transaction' in str(e).lower():
+                    # An earlier attempt reached the node before failing on our side; it is in the mempool
+                    return signed.hash
+                if attempt == 0 and 'nonce' in str(e).lower():
+                    # Another sender used this key; pick up the chain's view and retry once
+                    await self.nonce_manager.resync(sender)
+                    continue
+                await self.nonce_manager.release(sender, nonce)
+                raise
+
+class BatchTransferOperation(TransferOperation):
+    """Send ETH to many recipients with one balance check, one approval and pipelined broadcasts."""
+
+    async def validate(self, from_address: str, transfers: List[Tuple[str, float]]) -> bool:
+        try:
+            from_checksum = to_checksum_address(from_address)
+            for to_address, amount in transfers:
+                if not self.w3.is_address(to_address) or amount <= 0:
+                    print(f"{Fore.YELLOW}Invalid transfer: {amount} ETH to {to_address}{Style.RESET_ALL}")
+                    return False
+            
+            balance = await self.reads.get_balance(from_checksum)
+            total_wei = sum(self.w3.to_wei(amount, 'ether') for _, amount in transfers)
             
-            # Add security recommendation if 2FA is not being used
-            if approval_result.get("required2FA") and not approval_result.get("used2FA"):
-                print(f"\n{Fore.YELLOW}Security Recommendation:{Style.RESET_ALL}")
-                print("• 2FA is enabled but was not used for this approval")
-                print("• Consider using 2FA for enhanced security on high-value transactions")
-                print("• You can configure 2FA settings in the Telegram bot")
+            return balance >= total_wei
+        except Exception as e:
+            print(f"{Fore.RED}Validation error: {str(e)}{Style.RESET_ALL}")
+            return False
+
+    async def execute(self, from_address: str, transfers: List[Tuple[str, float]], private_key: str,
+                      urgency: str = 'normal',
+                      on_pending: Optional[Callable[[PendingApproval], None]] = None,
+                      agent_address: Optional[str] = None) -> List[dict]:
+        try:
+            from_checksum = to_checksum_address(from_address)
+            recipients = [(to_checksum_address(to), amount, self.w3.to_wei(amount, 'ether'))
+                          for to, amount in transfers]
+            total_wei = sum(wei_amount for _, _, wei_amount in recipients)
+            
+            print(f"{Fore.CYAN}Preparing {len(recipients)} transactions...{Style.RESET_ALL}")
+            
+            with latency_stats.span('gas_estimation'):
+                _, (max_fee, max_priority_fee), chain_id, *gas_limits = await asyncio.gather(
+                    self.nonce_manager.prime(from_checksum),
+                    self.fee_oracle.suggest(urgency),
+                    self.reads.chain_id(),
+                    *[self.gas_limit(from_checksum, to, wei_amount) for to, _, wei_amount in recipients]
+                )
             
-            signed = self.w3.eth.account.sign_transaction(transaction, private_key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed.raw_transaction)
+            # One approval covers the whole batch, checked against the total value
+            approval_result = await self.request_approval(
+                agent_address or from_checksum,
+                f"{len(recipients)} recipients",
+                total_wei,
+                max_fee,
+                on_pending,
+                recipients=[(to, wei_amount) for to, _, wei_amount in recipients]
+            )
+            self._check_approval(approval_result)
+            
+            transactions = [{
+                'from': from_checksum,
+                'to': to,
+                'value': wei_amount,
+                'gas': gas_limit,
+                'maxFeePerGas': max_fee,
+                'maxPriorityFeePerGas': max_priority_fee,
+                'chainId': chain_id,
+                'type': 2
+            } for (to, _, wei_amount), gas_limit in zip(recipients, gas_limits)]
             
-            return self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            tx_hashes = await asyncio.gather(
+                *[self.sign_and_send(transaction, private_key) for transaction in transactions],
+                return_exceptions=True
+            )
+            
+            results = []
+            for (to, amount, _), tx_hash in zip(recipients, tx_hashes):
+                entry = {'to': to, 'amount': amount}
+                if isinstance(tx_hash, Exception):
+                    entry['error'] = str(tx_hash)
+                else:
+                    entry['hash'] = Web3.to_hex(tx_hash)
+                results.append(entry)
+            return results
         except Exception as e:
             print(f"{Fore.RED}Execution error: {str(e)}{Style.RESET_ALL}")
             raise
+
 class BalanceOperation(Operation):
-    def validate(self, address: str) -> bool:
+    async def validate(self, address: str) -> bool:
         try:
             # Convert to checksum address before validation
-            checksum_address = self.w3.to_checksum_address(address)
+            checksum_address = to_checksum_address(address)
             return self.w3.is_address(checksum_address)
         except Exception as e:
             print(f"{Fore.RED}Validation error: {str(e)}{Style.RESET_ALL}")
             return False
 
-    def execute(self, address: str, **kwargs):
+    async def execute(self, address: str, **kwargs):
         try:
             # Convert to checksum address before getting balance
-            checksum_address = self.w3.to_checksum_address(address)
-            balance = self.w3.eth.get_balance(checksum_address)
+            checksum_address = to_checksum_address(address)
+            balance = await self.reads.get_balance(checksum_address)
             return {
                 'balance': self.w3.from_wei(balance, 'ether'),
                 'address': checksum_address
@@ -182,14 +1365,106 @@ class BalanceOperation(Operation):
             print(f"{Fore.RED}Execution error: {str(e)}{Style.RESET_ALL}")
             raise
 
+class BulkBalanceOperation(Operation):
+    """ETH and ERC-20 balances for many addresses via Multicall3, falling back to a JSON-RPC batch."""
+
+    # Keeps each aggregate3 eth_call well under node gas/response limits
+    chunk_size = 500
+
+    async def validate(self, addresses: List[str], tokens: Optional[List[str]] = None) -> bool:
+        invalid = [a for a in list(addresses) + list(tokens or []) if not self.w3.is_address(a)]
+        if invalid or not addresses:
+            print(f"{Fore.YELLOW}Invalid address format: {', '.join(invalid) or 'no addresses'}{Style.RESET_ALL}")
+            return False
+        return True
+
+    async def execute(self, addresses: List[str], tokens: Optional[List[str]] = None, **kwargs) -> List[dict]:
+        try:
+            addresses = [to_checksum_address(a) for a in addresses]
+            tokens = [to_checksum_address(t) for t in tokens or []]
+            
+            # Cached per network, so repeat lookups are a single aggregate3 round trip
+            if await self.code_cache.is_contract(MULTICALL3_ADDRESS, self.reads):
+                return await self._execute_multicall(addresses, tokens)
+            return await self._execute_batch(addresses, tokens)
+        except Exception as e:
+            print(f"{Fore.RED}Execution error: {str(e)}{Style.RESET_ALL}")
+            raise
+
+    async def _aggregate(self, calls: List[Tuple[str, bytes]]) -> List[Optional[bytes]]:
+        multicall = self.async_w3.eth.contract(address=MULTICALL3_ADDRESS, abi=MULTICALL3_ABI)
+        chunks = [calls[i:i + self.chunk_size] for i in range(0, len(calls), self.chunk_size)]
+        responses = await asyncio.gather(*[
+            multicall.functions.aggregate3([(target, True, data) for target, data in chunk]).call()
+            for chunk in chunks
+        ])
+        return [data if success else None for response in responses for success, data in response]
+
+    async def _execute_multicall(self, addresses: List[str], tokens: List[str]) -> List[dict]:
+        calls = []
+        for token in tokens:
+            calls.append((token, DECIMALS_SELECTOR))
+            calls.append((token, SYMBOL_SELECTOR))
+        for address in addresses:
+            encoded = abi_encode(['address'], [address])
+            calls.append((MULTICALL3_ADDRESS, GET_ETH_BALANCE_SELECTOR + encoded))
+            calls.extend((token, BALANCE_OF_SELECTOR + encoded) for token in tokens)
+        
+        results = iter(await self._aggregate(calls))
+        token_info = []
+        for token in tokens:
+            decimals, symbol = next(results), next(results)
+            token_info.append((
+                abi_decode(['string'], symbol)[0] if symbol else token,
+                abi_decode(['uint8'], decimals)[0] if decimals else 18
+            ))
+        
+        balances = []
+        for address in addresses:
+            eth_balance = next(results)
+            entry = {
+                'address': address,
+                'balance': self.w3.from_wei(abi_decode(['uint256'], eth_balance)[0], 'ether') if eth_balance else None,
+                'tokens': {}
+            }
+            for symbol, decimals in token_info:
+                raw = next(results)
+                entry['tokens'][symbol] = abi_decode(['uint256'], raw)[0] / 10 ** decimals if raw else None
+            balances.append(entry)
+        return balances
+
+    async def _execute_batch(self, addresses: List[str], tokens: List[str]) -> List[dict]:
+        try:
+            async with self.async_w3.batch_requests() as batch:
+                for address in addresses:
+                    batch.add(self.async_w3.eth.get_balance(address))
+                eth_balances = await batch.async_execute()
+        except (AttributeError, TypeError):
+            # Provider can't batch; concurrent calls still overlap on the keep-alive session
+            eth_balances = await asyncio.gather(*[self.async_w3.eth.get_balance(a) for a in addresses])
+        
+        token_balances = await asyncio.gather(*[
+            self.async_w3.eth.contract(address=token, abi=ERC20_BALANCE_ABI).functions.balanceOf(address).call()
+            for address in addresses for token in tokens
+        ])
+        token_balances = iter(token_balances)
+        
+        # Without Multicall3 token metadata isn't fetched; report raw balances keyed by token address
+        return [{
+            'address': address,
+            'balance': self.w3.from_wei(eth_balance, 'ether'),
+            'tokens': {token: next(token_balances) for token in tokens}
+        } for address, eth_balance in zip(addresses, eth_balances)]
+
 class FusionOperation(Operation):
-    def __init__(self, blockchain_network: BlockchainNetwork, transaction_history: list):
-        super().__init__(blockchain_network)
+    def __init__(self, blockchain_network: BlockchainNetwork, transaction_history: 'TransactionHistory',
+                 read_context: Optional[ReadContext] = None):
+        super().__init__(blockchain_network, read_context)
         self.account = Account.from_key(os.getenv('PRIVATE_KEY'))
         self.transaction_history = transaction_history
         self.usdc_threshold = 0.5  # 0.5 USDC threshold
 
-    def validate(self, amount: float) -> bool:
+    async def validate(self, amount: float) -> bool:
         try:
             if amount <= 0:
                 print(f"{Fore.YELLOW}Invalid amount{Style.RESET_ALL}")
@@ -197,18 +1472,12 @@ class FusionOperation(Operation):
                 
             # Check USDC balance
             usdc_address = "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913"  # BASE USDC
-            usdc_contract = self.w3.eth.contract(
-                address=self.w3.to_checksum_address(usdc_address),
-                abi=[{
-                    "constant": True,
-                    "inputs": [{"name": "_owner", "type": "address"}],
-                    "name": "balanceOf",
-                    "outputs": [{"name": "balance", "type": "uint256"}],
-                    "type": "function"
-                }]
+            usdc_contract = self.async_w3.eth.contract(
+                address=to_checksum_address(usdc_address),
+                abi=ERC20_BALANCE_ABI
             )
             
-            balance = usdc_contract.functions.balanceOf(self.account.address).call()
+            balance = await usdc_contract.functions.balanceOf(self.account.address).call()
             required = int(amount * 1e6)  # USDC has 6 decimals
             
             if balance < required:
@@ -222,19 +1491,26 @@ class FusionOperation(Operation):
             print(f"{Fore.RED}Validation error: {str(e)}{Style.RESET_ALL}")
             return False
 
-    def request_approval(self, amount: float) -> dict:
+    async def request_approval(self, amount: float,
+                               on_pending: Optional[Callable[[PendingApproval], None]] = None) -> dict:
         try:
             print(f"{Fore.CYAN}Requesting Fusion+ approval...{Style.RESET_ALL}")
             
-            url = "http://localhost:3000/api/request-fusion-approval"
             payload = {
                 "agentAddress": self.account.address,
                 "amount": str(amount),
                 "type": "fusion"
             }
 
-            response = requests.post(url, json=payload)
-            result = response.json()
+            with latency_stats.span('approval_wait'):
+                approval = await approval_client.request(
+                    '/api/request-fusion-approval', payload, f"Fusion+ swap of {amount} USDC"
+                )
+                if approval.pending:
+                    print(f"{Fore.CYAN}Waiting for a human decision on approval {approval.approval_id}...{Style.RESET_ALL}")
+                    if on_pending:
+                        on_pending(approval)
+                result = await approval.wait()
             
             # Handle response with 2FA status
             if result.get("approved"):
@@ -257,7 +1533,7 @@ class FusionOperation(Operation):
             print(f"{Fore.RED}Approval request error: {str(e)}{Style.RESET_ALL}")
             raise
 
-    def execute(self, amount: float):
+    async def execute(self, amount: float, on_pending: Optional[Callable[[PendingApproval], None]] = None):
         try:
             print(f"\n{Fore.CYAN}Initiating Fusion+ swap...{Style.RESET_ALL}")
             print(f"From: Base USDC")
@@ -269,7 +1545,7 @@ class FusionOperation(Operation):
                 
                 # Check if amount exceeds threshold and request approval if needed
                 if amount > self.usdc_threshold:
-                    approval_result = self.request_approval(amount)
+                    approval_result = await self.request_approval(amount, on_pending)
                     
                     if not approval_result.get("approved"):
                         if approval_result.get("reason") == "Approval timeout":
@@ -286,17 +1562,16 @@ class FusionOperation(Operation):
                 pbar.update(30)
                 
                 # Call the Node.js service
-                response = requests.post(
+                status, result = await _post_json(
                     'http://localhost:3001/fusion-swap',
-                    json={"amount": str(amount)}
+                    {"amount": str(amount)}
                 )
                 
                 pbar.update(25)
                 
-                if response.status_code != 200:
-                    raise Exception(f"Fusion swap failed: {response.json().get('error')}")
+                if status != 200:
+                    raise Exception(f"Fusion swap failed: {result.get('error')}")
                     
-                result = response.json()
                 pbar.update(25)
                 
                 # Add to transaction history
@@ -315,7 +1590,7 @@ class FusionOperation(Operation):
                 print(f"\n{Fore.CYAN}Status:{Style.RESET_ALL}")
                 print("• The swap will be processed automatically via Fusion+")
                 print("• This process can take several minutes")
-                print("• You can check the status in transaction history")
+                print("• You'll be notified here when the order completes")
                 print(f"• Track on 1inch: https://fusion.1inch.io/history")
                 
                 return result
@@ -323,92 +1598,221 @@ class FusionOperation(Operation):
         except Exception as e:
             print(f"{Fore.RED}Fusion execution error: {str(e)}{Style.RESET_ALL}")
             raise
+class PriceOracle:
+    """Cached ETH/USD price with stale-while-revalidate refresh on the agent's event loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop,
+                 source: Optional[Callable[[], Awaitable[float]]] = None,
+                 ttl: float = 60, timeout: float = 5):
+        self.loop = loop
+        self.source = source or self._fetch_coingecko
+        self.ttl = ttl
+        self.timeout = timeout
+        self.url = os.getenv('ETH_PRICE_URL', COINGECKO_ETH_PRICE_URL)
+        self.price: Optional[float] = None
+        self.updated_at = 0.0
+        self.last_error: Optional[str] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def _fetch_coingecko(self) -> float:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        async with self._session.get(self.url) as response:
+            response.raise_for_status()
+            data = await response.json(content_type=None)
+            return float(data['ethereum']['usd'])
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+    def is_fresh(self) -> bool:
+        return self.price is not None and time.monotonic() - self.updated_at < self.ttl
+
+    def get_price(self) -> Optional[float]:
+        """Return the cached price immediately, scheduling a refresh if it is stale."""
+        if not self.is_fresh():
+            self.refresh()
+        return self.price
+
+    def refresh(self) -> None:
+        self.loop.call_soon_threadsafe(self._ensure_refresh)
+
+    def _ensure_refresh(self) -> asyncio.Future:
+        # Single-flight: concurrent lookups share the one request already in progress
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._refresh())
+        return self._inflight
+
+    async def _refresh(self) -> Optional[float]:
         try:
-            print(f"\n{Fore.CYAN}Initiating Fusion+ swap...{Style.RESET_ALL}")
-            print(f"From: Base USDC")
-            print(f"To: Arbitrum USDC")
-            print(f"Amount: {amount} USDC\n")
-            
-            with tqdm(total=100, desc="Processing", bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt}') as pbar:
-                # Call the Node.js service
-                response = requests.post(
-                    'http://localhost:3001/fusion-swap',
-                    json={"amount": str(amount)}
-                )
-                
-                pbar.update(50)
-                
-                if response.status_code != 200:
-                    raise Exception(f"Fusion swap failed: {response.json().get('error')}")
-                    
-                result = response.json()
-                pbar.update(50)
-                
-                # Add to transaction history
-                self.transaction_history.append({
-                    'hash': result['orderHash'],
-                    'type': 'Fusion+ Swap',
-                    'amount': amount,
-                    'from': 'Base USDC',
-                    'to': 'Arbitrum USDC',
-                    'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'status': 'pending'
-                })
-                
-                print(f"\n{Fore.GREEN}Fusion+ swap initiated successfully!{Style.RESET_ALL}")
-                print(f"Order hash: {Fore.YELLOW}{result['orderHash']}{Style.RESET_ALL}")
-                print(f"\n{Fore.CYAN}Status:{Style.RESET_ALL}")
-                print("• The swap will be processed automatically via Fusion+")
-                print("• This process can take several minutes")
-                print("• You can check the status in transaction history")
-                print(f"• Track on 1inch: https://fusion.1inch.io/history")
-                
-                return result
-                
+            self.price = await asyncio.wait_for(self.source(), self.timeout)
+            self.updated_at = time.monotonic()
+            self.last_error = None
         except Exception as e:
-            print(f"{Fore.RED}Fusion execution error: {str(e)}{Style.RESET_ALL}")
-            raise
+            # Keep serving the last known price, which stays stale so the next lookup retries;
+            # summaries simply omit USD if there is none
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"{Fore.YELLOW}ETH price refresh failed: {self.last_error}{Style.RESET_ALL}")
+        return self.price
+
+class TransactionHistory:
+    """SQLite-backed transaction history: one row per transaction, inserted once; receipt updates
+    rewrite its status and details in place, so the table holds current state rather than an event log."""
+
+    COLUMNS = ('hash', 'type', 'amount', 'time', 'status')
+
+    def __init__(self, path: str = 'transaction_history.db'):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        # Receipt updates arrive on the event loop thread, appends on the chat thread
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS transactions ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, hash TEXT, type TEXT, amount REAL, '
+                'time TEXT, status TEXT, details TEXT)'
+            )
+            for column in ('time', 'type', 'status', 'hash'):
+                self._conn.execute(f'CREATE INDEX IF NOT EXISTS idx_transactions_{column} ON transactions ({column})')
+
+    def append(self, entry: dict) -> None:
+        details = {k: v for k, v in entry.items() if k not in self.COLUMNS}
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT INTO transactions (hash, type, amount, time, status, details) VALUES (?, ?, ?, ?, ?, ?)',
+                (entry['hash'], entry['type'], entry['amount'], entry['time'], entry.get('status'),
+                 json.dumps(details, default=str))
+            )
+
+    def update(self, tx_hash: str, updates: dict) -> None:
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                'SELECT id, details FROM transactions WHERE hash = ? ORDER BY id DESC LIMIT 1', (tx_hash,)
+            ).fetchone()
+            if row is None:
+                return
+            details = json.loads(row['details'] or '{}')
+            details.update({k: v for k, v in updates.items() if k not in self.COLUMNS})
+            self._conn.execute(
+                'UPDATE transactions SET status = COALESCE(?, status), details = ? WHERE id = ?',
+                (updates.get('status'), json.dumps(details, default=str), row['id'])
+            )
+
+    def _where(self, tx_type: Optional[str], status: Optional[str],
+               since: Optional[str], until: Optional[str]) -> Tuple[str, list]:
+        clauses, args = [], []
+        for clause, value in (('type = ? COLLATE NOCASE', tx_type), ('status = ?', status),
+                              ('time >= ?', since), ('time <= ?', until)):
+            if value is not None:
+                clauses.append(clause)
+                args.append(value)
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), args
+
+    def count(self, tx_type: Optional[str] = None, status: Optional[str] = None,
+              since: Optional[str] = None, until: Optional[str] = None) -> int:
+        where, args = self._where(tx_type, status, since, until)
+        with self._lock:
+            return self._conn.execute(f'SELECT COUNT(*) FROM transactions{where}', args).fetchone()[0]
+
+    def history(self, page: int = 1, page_size: int = 20, tx_type: Optional[str] = None,
+                status: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None):
+        """Yield one page of entries, newest first, decoding rows only as they are consumed."""
+        where, args = self._where(tx_type, status, since, until)
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT * FROM transactions{where} ORDER BY id DESC LIMIT ? OFFSET ?',
+                args + [page_size, (page - 1) * page_size]
+            ).fetchall()
+        for row in rows:
+            entry = json.loads(row['details'] or '{}')
+            entry.update({column: row[column] for column in self.COLUMNS})
+            yield entry
+
+    def __len__(self) -> int:
+        return self.count()
+
+class IntentCache:
+    """LRU cache of normalized user message -> parsed intent."""
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # process_message may run on several threads at once (benchmark.py does)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(message: str) -> str:
+        return ' '.join(message.lower().split()).rstrip('.!?')
+
+    def get(self, message: str) -> Optional[Dict]:
+        key = self.normalize(message)
+        with self._lock:
+            intent = self._entries.get(key)
+            if intent is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+        # Callers mutate parameters (private key, from address), so never hand out the cached dict
+        return copy.deepcopy(intent)
+
+    def put(self, message: str, intent: Dict) -> None:
+        key = self.normalize(message)
+        intent = copy.deepcopy(intent)
+        with self._lock:
+            self._entries[key] = intent
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
 class BlockchainAgent:
-    def __init__(self, model: str = "gpt-4-1106-preview"):
+    def __init__(self, model: Optional[str] = None):
         self._print_welcome_banner()
         print(f"{Fore.CYAN}Initializing blockchain connection...{Style.RESET_ALL}")
         
         self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-        self.model = model
+        self.model = model or os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
+        # 'tools' uses strict function calling; 'json' falls back to JSON mode for models without it
+        self.intent_mode = os.getenv('INTENT_MODE', 'tools')
+        # Operations are coroutines; run them on one long-lived loop so async providers keep their sessions
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        self.price_oracle = PriceOracle(self.loop, ttl=float(os.getenv('ETH_PRICE_TTL', '60')))
+        self.price_oracle.refresh()
         self.networks = self._initialize_networks()
+        # Probe every network concurrently in the background so startup never waits on an RPC
+        self.probe_timeout = float(os.getenv('NETWORK_PROBE_TIMEOUT', '5'))
+        asyncio.run_coroutine_threadsafe(self._probe_networks(), self.loop)
         self.current_network = None
         self.private_key = os.getenv('PRIVATE_KEY')
-        self.account = Account.from_key(self.private_key)
-        self.transaction_history = []
+        self.signers = SignerPool.from_env(self.private_key)
+        self.account = self.signers.primary
+        self.transaction_history = TransactionHistory(os.getenv('HISTORY_DB_PATH', 'transaction_history.db'))
+        self.fee_urgency = os.getenv('FEE_URGENCY', 'normal')
+        self.pin_reads = os.getenv('PIN_READ_BLOCK', 'false').lower() == 'true'
+        # ERC-20 tokens included in bulk balance checks
+        self.balance_tokens = [t.strip() for t in os.getenv('BALANCE_TOKENS', '').split(',') if t.strip()]
+        self.intent_cache = IntentCache(int(os.getenv('INTENT_CACHE_SIZE', '256')))
+        self.pending_approvals: Dict[str, PendingApproval] = {}
+        self._approvals_lock = threading.Lock()
+        registry_address = os.getenv('AGENTS_REGISTRY_ADDRESS', AGENTS_REGISTRY_ADDRESS)
+        if registry_address:
+            approval_client.agent_config = AgentConfigCache(
+                self.networks['base-sepolia'].async_w3, self.account.address, registry_address,
+                reconcile_interval=float(os.getenv('REGISTRY_RECONCILE_INTERVAL', '600'))
+            )
+        self.fusion_tracker = FusionOrderTracker(os.getenv('FUSION_SERVICE_URL', 'http://localhost:3001'))
+        self._resume_fusion_tracking()
 
         print(f"{Fore.GREEN}✓ Successfully initialized with address:{Style.RESET_ALL}")
         print(f"{Fore.YELLOW}{self.account.address}{Style.RESET_ALL}\n")
         
-        self.system_prompt = """
-        You are a blockchain operations assistant that ALWAYS responds in JSON format.
-        You help with cryptocurrency operations and MUST format all responses as JSON.
-
-        Available operations:
-        1. transfer - Send ETH to an address
-        2. balance - Check account balance
-        3. fusion - Bridge USDC from Base to Arbitrum using 1inch Fusion+
-
-        For ALL inputs, respond with a JSON object containing:
-        {
-            "operation_type": "transfer" or "balance" or "fusion",
-            "parameters": {
-                // For transfer:
-                "to_address": "ethereum_address",
-                "amount": number,
-                
-                // For balance:
-                "address": "ethereum_address",
-                
-                // For fusion:
-                "amount": number
-            }
-        }
-        """
+        self.system_prompt = INTENT_SYSTEM_PROMPT if self.intent_mode == 'tools' else INTENT_SYSTEM_PROMPT + INTENT_JSON_FORMAT
 
     def _print_welcome_banner(self):
         banner = f"""
@@ -419,11 +1823,8 @@ class BlockchainAgent:
         print(banner)
 
     def _get_eth_price(self) -> Optional[float]:
-        try:
-            response = requests.get('https://api.coingecko.com/api/v3/simple/price?ids=ethereum&vs_currencies=usd')
-            return response.json()['ethereum']['usd']
-        except:
-            return None
+        # Never blocks: returns the cached price (possibly stale) and refreshes in the background
+        return self.price_oracle.get_price()
 
     def _print_transaction_summary(self, tx_hash: str, amount: float):
         eth_price = self._get_eth_price()
@@ -444,32 +1845,266 @@ class BlockchainAgent:
             usd_value = balance * eth_price
             print(f"└─ USD Value: ${usd_value:.2f}")
 
+    def _print_bulk_balance_summary(self, balances: List[dict]):
+        eth_price = self._get_eth_price()
+        total = sum(entry['balance'] for entry in balances if entry['balance'] is not None)
+        print(f"\n{Fore.CYAN}Balances ({len(balances)} addresses):{Style.RESET_ALL}")
+        for entry in balances:
+            tokens = ''.join(f", {amount} {symbol}" for symbol, amount in entry['tokens'].items())
+            print(f"├─ {Fore.YELLOW}{entry['address']}{Style.RESET_ALL}: {Fore.GREEN}{entry['balance']} ETH{Style.RESET_ALL}{tokens}")
+        if eth_price:
+            print(f"├─ USD Value: ${float(total) * eth_price:.2f}")
+        print(f"└─ Total: {Fore.GREEN}{total} ETH{Style.RESET_ALL}")
+
+    def _load_address_file(self, path: str) -> List[str]:
+        """Read one address per line (extra CSV columns are ignored)."""
+        with open(path) as f:
+            return [line.split(',')[0].strip() for line in f
+                    if line.strip() and not line.startswith('#')]
+
+    def _print_batch_summary(self, results: List[dict]):
+        sent = [entry for entry in results if 'error' not in entry]
+        total = Web3.from_wei(sum(Web3.to_wei(entry['amount'], 'ether') for entry in sent), 'ether')
+        eth_price = self._get_eth_price()
+        print(f"\n{Fore.CYAN}Batch Summary:{Style.RESET_ALL}")
+        for entry in results:
+            if 'error' in entry:
+                print(f"├─ {Fore.RED}✗ {entry['amount']} ETH to {entry['to']}: {entry['error']}{Style.RESET_ALL}")
+            else:
+                print(f"├─ {Fore.GREEN}✓{Style.RESET_ALL} {entry['amount']} ETH to {entry['to']} ({Fore.YELLOW}{entry['hash']}{Style.RESET_ALL})")
+        print(f"├─ Sent: {len(sent)}/{len(results)}")
+        if eth_price:
+            print(f"├─ USD Value: ${float(total) * eth_price:.2f}")
+        print(f"└─ Total: {Fore.GREEN}{total} ETH{Style.RESET_ALL}")
+
+    def _load_batch_file(self, path: str) -> List[Tuple[str, float]]:
+        """Read `address,amount` lines from a CSV payout file."""
+        transfers = []
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                address, amount = [part.strip() for part in line.split(',')[:2]]
+                transfers.append((address, float(amount)))
+        return transfers
+
+    def batch_transfer(self, transfers: List[Tuple[str, float]]) -> Optional[List[dict]]:
+        return self._execute_operation('batch_transfer', {'transfers': transfers})
+
+    def _show_signers(self):
+        available = self._run(self.signers.available(ReadContext(self.current_network)))
+        print(f"\n{Fore.CYAN}Signers on {self.current_network.network_name}:{Style.RESET_ALL}")
+        for i, account in enumerate(self.signers.accounts):
+            branch = '└─' if i == len(self.signers.accounts) - 1 else '├─'
+            role = ' (agent)' if account is self.signers.primary else ''
+            print(f"{branch} {account.address}{role}: {Web3.from_wei(available[account.address], 'ether')} ETH spendable, "
+                  f"{self.signers.in_flight[account.address]} in flight")
+
+    def rebalance_signers(self) -> List:
+        """Top up signers below SIGNER_MIN_BALANCE to SIGNER_TARGET_BALANCE from the best-funded ones."""
+        min_balance = Web3.to_wei(os.getenv('SIGNER_MIN_BALANCE', '0.01'), 'ether')
+        target = Web3.to_wei(os.getenv('SIGNER_TARGET_BALANCE', '0.05'), 'ether')
+        available = self._run(self.signers.available(ReadContext(self.current_network)))
+        if all(wei >= min_balance for wei in available.values()):
+            print(f"{Fore.GREEN}✓ Every signer holds at least {Web3.from_wei(min_balance, 'ether')} ETH{Style.RESET_ALL}")
+            return []
+        plan = self.signers.rebalance_plan(available, min_balance, target)
+        if not plan:
+            print(f"{Fore.YELLOW}No signer holds more than {Web3.from_wei(target, 'ether')} ETH to share{Style.RESET_ALL}")
+            return []
+        
+        results = []
+        for source, destination, wei_amount in plan:
+            print(f"{Fore.CYAN}Moving {Web3.from_wei(wei_amount, 'ether')} ETH from {source} to {destination}{Style.RESET_ALL}")
+            results.append(self._execute_operation('transfer', {
+                'to_address': destination,
+                'amount': float(Web3.from_wei(wei_amount, 'ether')),
+                'from_address': source
+            }))
+        return results
+
     def _print_help(self):
         help_text = f"""
     {Fore.CYAN}Available Commands:{Style.RESET_ALL}
     ├─ {Fore.GREEN}balance{Style.RESET_ALL} - Check your balance
-    ├─ {Fore.GREEN}send X ETH to ADDRESS{Style.RESET_ALL} - Send ETH to an address
+    ├─ {Fore.GREEN}send X ETH to ADDRESS [slow|normal|fast]{Style.RESET_ALL} - Send ETH to an address
     ├─ {Fore.GREEN}fusion X USDC{Style.RESET_ALL} - Bridge USDC to Arbitrum using 1inch Fusion+
+    ├─ {Fore.GREEN}balances ADDRESS ADDRESS...{Style.RESET_ALL} - Check many balances in one round trip
+    ├─ {Fore.GREEN}balances FILE{Style.RESET_ALL} - Check balances of every address in a file
+    ├─ {Fore.GREEN}batch FILE{Style.RESET_ALL} - Send ETH to every `address,amount` line in a CSV file
+    ├─ {Fore.GREEN}networks{Style.RESET_ALL} - Show network and RPC endpoint health
+    ├─ {Fore.GREEN}signers{Style.RESET_ALL} - Show signer accounts, spendable balances and in-flight transfers
+    ├─ {Fore.GREEN}rebalance{Style.RESET_ALL} - Top up underfunded signer accounts from the best-funded ones
+    ├─ {Fore.GREEN}approvals{Style.RESET_ALL} - List operations waiting for human approval
+    ├─ {Fore.GREEN}stats [FILE]{Style.RESET_ALL} - Show per-stage latency; optionally export as JSON lines
     ├─ {Fore.GREEN}help{Style.RESET_ALL} - Show this help message
-    ├─ {Fore.GREEN}history{Style.RESET_ALL} - Show transaction history
+    ├─ {Fore.GREEN}history [PAGE] [type=T] [status=S]{Style.RESET_ALL} - Show transaction history
     └─ {Fore.GREEN}exit{Style.RESET_ALL} - Exit the program
     """
         print(help_text)
 
-    def _show_transaction_history(self):
-        if not self.transaction_history:
+    def _show_transaction_history(self, page: int = 1, tx_type: Optional[str] = None, status: Optional[str] = None):
+        total = self.transaction_history.count(tx_type=tx_type, status=status)
+        if not total:
             print(f"{Fore.YELLOW}No transactions in history.{Style.RESET_ALL}")
             return
         
-        print(f"\n{Fore.CYAN}Transaction History:{Style.RESET_ALL}")
-        for i, tx in enumerate(self.transaction_history, 1):
+        page_size = 20
+        pages = (total + page_size - 1) // page_size
+        print(f"\n{Fore.CYAN}Transaction History (page {page}/{pages}, {total} total):{Style.RESET_ALL}")
+        entries = self.transaction_history.history(page, page_size, tx_type=tx_type, status=status)
+        for i, tx in enumerate(entries, (page - 1) * page_size + 1):
             print(f"Transaction {i}:")
             print(f"├─ Hash: {Fore.YELLOW}{tx['hash']}{Style.RESET_ALL}")
             print(f"├─ Type: {tx['type']}")
             print(f"├─ Amount: {Fore.GREEN}{tx['amount']} ETH{Style.RESET_ALL}")
+            if tx.get('status'):
+                print(f"├─ Status: {tx['status']}")
+            if tx.get('fills'):
+                print(f"├─ Fills: {tx['fills']}")
+            if tx.get('gas_used') is not None:
+                print(f"├─ Gas Used: {tx['gas_used']}")
             print(f"└─ Time: {tx['time']}\n")
 
-    def _execute_operation(self, operation_type: str, params: Dict):
+    def _show_latency_stats(self, export_path: Optional[str] = None):
+        snapshot = latency_stats.snapshot()
+        if not snapshot:
+            print(f"{Fore.YELLOW}No latency data yet.{Style.RESET_ALL}")
+            return
+        
+        print(f"\n{Fore.CYAN}Stage latency (ms):{Style.RESET_ALL}")
+        print(f"{'stage':<16}{'count':>7}{'errors':>8}{'mean':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+        for stage, stats in snapshot.items():
+            print(f"{stage:<16}{stats['count']:>7}{stats['errors']:>8}{stats['mean_ms']:>10}"
+                  f"{stats['p50_ms']:>10}{stats['p90_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+            print(f"{'':<16}{Fore.YELLOW}{'  '.join(f'{k}: {v}' for k, v in stats['buckets'].items())}{Style.RESET_ALL}")
+        
+        if export_path:
+            latency_stats.export(export_path)
+            print(f"{Fore.GREEN}✓ Exported to {export_path}{Style.RESET_ALL}")
+
+    def _parse_history_command(self, user_input: str) -> Dict:
+        """Turn `history [PAGE] [type=TYPE] [status=STATUS]` into keyword arguments."""
+        kwargs = {}
+        for arg in user_input.split()[1:]:
+            if arg.isdigit():
+                kwargs['page'] = max(1, int(arg))
+            elif arg.startswith('type='):
+                kwargs['tx_type'] = arg[5:].replace('_', ' ')
+            elif arg.startswith('status='):
+                kwargs['status'] = arg[7:]
+        return kwargs
+
+    def _run(self, coro):
+        """Run a coroutine on the agent's event loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def close(self):
+        """Stop the background pollers and close the HTTP sessions on the agent's loop, then stop it."""
+        async def close_sessions():
+            # Background pollers (fee oracle, receipts, Fusion+ orders) would otherwise die pending
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.price_oracle.close()
+            for network in self.networks.values():
+                await network.async_w3.provider.disconnect()
+        try:
+            self._run(close_sessions())
+        except Exception as e:
+            print(f"{Fore.RED}Shutdown error: {str(e)}{Style.RESET_ALL}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def _run_or_defer(self, start: Callable[[Callable[[PendingApproval], None]], Awaitable],
+                      on_complete: Callable[[object], None]):
+        """Run an operation in the foreground until it has to wait for a human, then let it finish in the background.
+
+        Returns the operation's result, or None once it has been deferred.
+        """
+        deferred = concurrent.futures.Future()
+        future = asyncio.run_coroutine_threadsafe(start(deferred.set_result), self.loop)
+        concurrent.futures.wait([future, deferred], return_when=concurrent.futures.FIRST_COMPLETED)
+        if future.done():
+            result = future.result()
+            on_complete(result)
+            return result
+        
+        approval = deferred.result()
+        with self._approvals_lock:
+            self.pending_approvals[approval.approval_id] = approval
+
+        def finish(done: concurrent.futures.Future):
+            with self._approvals_lock:
+                self.pending_approvals.pop(approval.approval_id, None)
+            try:
+                on_complete(done.result())
+            except Exception as e:
+                print(f"\n{Fore.RED}✗ {approval.description or 'Operation'} failed: {str(e)}{Style.RESET_ALL}")
+        
+        future.add_done_callback(finish)
+        return None
+
+    def _show_pending_approvals(self):
+        with self._approvals_lock:
+            pending = list(self.pending_approvals.items())
+        if not pending:
+            print(f"{Fore.YELLOW}No operations waiting for approval.{Style.RESET_ALL}")
+            return
+        print(f"\n{Fore.CYAN}Waiting for approval:{Style.RESET_ALL}")
+        for approval_id, approval in pending:
+            waited = int(time.monotonic() - approval.created)
+            print(f"├─ {approval_id}: {approval.description} ({waited}s)")
+
+    def _record_transaction(self, entry: dict, network: Optional[BlockchainNetwork] = None,
+                            on_update: Optional[Callable[[str, dict], None]] = None):
+        """Add a sent transaction to history and follow it until it is mined."""
+        self.transaction_history.append(entry)
+        tracker = (network or self.current_network).receipt_tracker
+        # Not awaited: this also runs on the loop thread when a deferred operation completes
+        asyncio.run_coroutine_threadsafe(tracker.track(entry['hash'], on_update or self._on_receipt), self.loop)
+
+    def _settle_signer(self, address: str, value: int) -> Callable[[str, dict], None]:
+        """Receipt callback that frees the signer's reservation before the usual handling."""
+        def on_update(tx_hash: str, updates: dict):
+            self.signers.release(address, value)
+            self._on_receipt(tx_hash, updates)
+        return on_update
+
+    def _on_receipt(self, tx_hash: str, updates: dict):
+        self.transaction_history.update(tx_hash, updates)
+        if updates['status'] == 'confirmed':
+            print(f"\n{Fore.GREEN}✓ Transaction {tx_hash} confirmed in block {updates['block']} "
+                  f"(gas used: {updates['gas_used']}){Style.RESET_ALL}")
+        elif updates['status'] == 'failed':
+            print(f"\n{Fore.RED}✗ Transaction {tx_hash} failed in block {updates['block']}{Style.RESET_ALL}")
+        else:
+            print(f"\n{Fore.YELLOW}Transaction {tx_hash} still unconfirmed; stopped tracking{Style.RESET_ALL}")
+
+    def _resume_fusion_tracking(self):
+        """Pick up Fusion+ orders left pending by a previous session."""
+        pending = self.transaction_history.count(tx_type='Fusion+ Swap', status='pending')
+        if not pending:
+            return
+        for order in self.transaction_history.history(1, pending, tx_type='Fusion+ Swap', status='pending'):
+            self._run(self.fusion_tracker.track(order['hash'], self._on_fusion_update, fills=order.get('fills')))
+
+    def _on_fusion_update(self, order_hash: str, updates: dict):
+        self.transaction_history.update(order_hash, updates)
+        fills = f" ({updates['fills']} fills)" if updates.get('fills') else ''
+        if updates['status'] == 'completed':
+            print(f"\n{Fore.GREEN}✓ Fusion+ order {order_hash} completed{fills}{Style.RESET_ALL}")
+        elif updates['status'] == 'timeout':
+            print(f"\n{Fore.YELLOW}Fusion+ order {order_hash} still pending; stopped tracking{Style.RESET_ALL}")
+        elif updates['status'] == 'not_found':
+            print(f"\n{Fore.YELLOW}Fusion+ order {order_hash} is unknown to the Fusion+ service; stopped tracking{Style.RESET_ALL}")
+        elif updates['status'] in FusionOrderTracker.TERMINAL_STATUSES:
+            print(f"\n{Fore.RED}✗ Fusion+ order {order_hash} {updates['status']}{fills}{Style.RESET_ALL}")
+        else:
+            print(f"\n{Fore.CYAN}Fusion+ order {order_hash}: {updates['status']}{fills}{Style.RESET_ALL}")
+
+    def _execute_operation(self, operation_type: str, params: Dict, reads: Optional[ReadContext] = None):
         if operation_type == "fusion":
             previous_network = self.current_network
             self.set_network('base')
@@ -478,83 +2113,170 @@ class BlockchainAgent:
             try:
                 # Pass transaction_history to FusionOperation
                 op = FusionOperation(self.current_network, self.transaction_history)
-                if not op.validate(params['amount']):
+                if not self._run(op.validate(params['amount'])):
                     raise Exception("Fusion validation failed")
-                result = op.execute(params['amount'])
-                return result
+                
+                def on_complete(result):
+                    asyncio.run_coroutine_threadsafe(
+                        self.fusion_tracker.track(result['orderHash'], self._on_fusion_update), self.loop
+                    )
+                
+                return self._run_or_defer(lambda on_pending: op.execute(params['amount'], on_pending), on_complete)
             finally:
                 # Switch back to Base Sepolia for other operations
                 self.current_network = previous_network
         elif operation_type == "transfer":
             print(f"\n{Fore.CYAN}Executing transfer...{Style.RESET_ALL}")
             with tqdm(total=100, desc="Processing", bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt}') as pbar:
-                op = TransferOperation(self.current_network)
-                params['private_key'] = self.private_key
-                params['from_address'] = self.account.address
+                network = self.current_network
+                reads = reads or ReadContext(network)
+                op = TransferOperation(network, reads)
+                wei_amount = network.w3.to_wei(params['amount'], 'ether')
+                signer = self._run(self.signers.acquire(reads, wei_amount, address=params.pop('from_address', None)))
+                if signer is None:
+                    raise Exception("No signer account can fund this transfer")
+                params['private_key'] = signer.key
+                params.setdefault('urgency', self.fee_urgency)
+                params['from_address'] = signer.address
+                params['agent_address'] = self.account.address
                 
-                pbar.update(30)
-                time.sleep(0.5)
-                result = op.execute(**params)
-                pbar.update(70)
+                foreground = True
                 
-                self.transaction_history.append({
-                    'hash': result.transactionHash.hex(),
-                    'type': 'Transfer',
-                    'amount': params['amount'],
-                    'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                })
+                def on_complete(result):
+                    # After a deferred approval the bar is already closed; only the summary is printed then
+                    if foreground:
+                        pbar.update(70)
+                    tx_hash = Web3.to_hex(result)
+                    self._record_transaction({
+                        'hash': tx_hash,
+                        'type': 'Transfer',
+                        'amount': params['amount'],
+                        'from': signer.address,
+                        'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                        'status': 'pending'
+                    }, network, self._settle_signer(signer.address, wei_amount))
+                    
+                    self._print_transaction_summary(tx_hash, params['amount'])
+                
+                async def send(on_pending):
+                    try:
+                        return await op.execute(**params, on_pending=on_pending)
+                    except Exception:
+                        self.signers.release(signer.address, wei_amount)
+                        raise
                 
-                self._print_transaction_summary(result.transactionHash.hex(), params['amount'])
+                pbar.update(30)
+                result = self._run_or_defer(send, on_complete)
+                foreground = False
                 return result
+        elif operation_type == "batch_transfer":
+            print(f"\n{Fore.CYAN}Executing batch transfer...{Style.RESET_ALL}")
+            network = self.current_network
+            reads = reads or ReadContext(network)
+            op = BatchTransferOperation(network, reads)
+            transfers = params['transfers']
+            amounts = [network.w3.to_wei(amount, 'ether') for _, amount in transfers]
+            # The whole batch goes out from one signer so its nonces pipeline
+            signer = self._run(self.signers.acquire(reads, sum(amounts), len(transfers)))
+            if signer is None or not self._run(op.validate(signer.address, transfers)):
+                if signer is not None:
+                    for wei_amount in amounts:
+                        self.signers.release(signer.address, wei_amount)
+                raise Exception("Batch validation failed: insufficient balance or invalid recipient")
+            
+            def on_complete(results):
+                for entry, wei_amount in zip(results, amounts):
+                    if 'hash' not in entry:
+                        self.signers.release(signer.address, wei_amount)
+                        continue
+                    self._record_transaction({
+                        'hash': entry['hash'],
+                        'type': 'Batch Transfer',
+                        'amount': entry['amount'],
+                        'from': signer.address,
+                        'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                        'status': 'pending'
+                    }, network, self._settle_signer(signer.address, wei_amount))
+                self._print_batch_summary(results)
+            
+            async def send(on_pending):
+                try:
+                    return await op.execute(signer.address, transfers, signer.key,
+                                            params.get('urgency', self.fee_urgency), on_pending, self.account.address)
+                except Exception:
+                    for wei_amount in amounts:
+                        self.signers.release(signer.address, wei_amount)
+                    raise
+            
+            return self._run_or_defer(send, on_complete)
+        elif operation_type == "bulk_balance":
+            op = BulkBalanceOperation(self.current_network, reads)
+            tokens = params.get('tokens', self.balance_tokens)
+            if not self._run(op.validate(params['addresses'], tokens)):
+                raise Exception("Bulk balance validation failed")
+            result = self._run(op.execute(params['addresses'], tokens))
+            self._print_bulk_balance_summary(result)
+            return result
         elif operation_type == "balance":
-            op = BalanceOperation(self.current_network)
-            result = op.execute(params.get('address', self.account.address))
+            op = BalanceOperation(self.current_network, reads)
+            result = self._run(op.execute(params.get('address', self.account.address)))
             self._print_balance_summary(float(result['balance']), result['address'])
             return result
 
+    def _fast_parse_intent(self, user_message: str) -> Optional[Dict]:
+        """Parse common command shapes without the LLM; returns None when unsure."""
+        message = IntentCache.normalize(user_message)
+        
+        match = TRANSFER_PATTERN.match(message)
+        if match:
+            intent = {
+                'operation_type': 'transfer',
+                'parameters': {
+                    'to_address': to_checksum_address(match.group(2)),
+                    'amount': float(match.group(1))
+                }
+            }
+            if match.group(3):
+                intent['parameters']['urgency'] = match.group(3)
+            return intent
+        
+        if OWN_BALANCE_PATTERN.match(message):
+            return {'operation_type': 'balance', 'parameters': {'address': self.account.address}}
+        
+        match = ADDRESS_BALANCE_PATTERN.match(message)
+        if match:
+            address = match.group(1) or match.group(2)
+            return {'operation_type': 'balance', 'parameters': {'address': to_checksum_address(address)}}
+        
+        match = BULK_BALANCE_PATTERN.match(message)
+        if match:
+            addresses = re.findall(_ADDRESS, match.group(1))
+            return {'operation_type': 'bulk_balance', 'parameters': {'addresses': addresses}}
+        
+        if any(x in message for x in FUSION_KEYWORDS):
+            # Extract amount from message
+            for word in message.split():
+                try:
+                    return {'operation_type': 'fusion', 'parameters': {'amount': float(word)}}
+                except ValueError:
+                    continue
+        
+        return None
+
     def _parse_intent(self, user_message: str) -> Dict:
         """Parse user message into structured operation using GPT."""
-        modified_prompt = f"""
-        You are a blockchain operations assistant that ALWAYS responds in JSON format.
-        You help with cryptocurrency operations and MUST format all responses as JSON.
-        The current user's address is: {self.account.address}
-
-        Available operations:
-        1. transfer - Send ETH to an address
-        2. balance - Check account balance
-
-        For ALL inputs, respond with a JSON object containing:
-        {{
-            "operation_type": "transfer" or "balance",
-            "parameters": {{
-                // For transfer:
-                "to_address": "ethereum_address",
-                "amount": number,
-                
-                // For balance:
-                "address": "ethereum_address" or null  // null means check user's own balance
-            }}
-        }}
-
-        Examples:
-        1. "Check my balance" -> use null for address (will default to user's address)
-        2. "Check balance of 0x123..." -> use the specified address
-        3. "What's the balance for 0x456..." -> use the specified address
-        """
+        cached = self.intent_cache.get(user_message)
+        if cached is not None:
+            print(f"{Fore.CYAN}Parsed intent (cached): {cached}{Style.RESET_ALL}")
+            return cached
         
         messages = [
-            {"role": "system", "content": modified_prompt},
-            {"role": "user", "content": f"Parse this request into JSON format: {user_message}"}
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": f"{user_message}\n\n(My address: {self.account.address})"}
         ]
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                response_format={"type": "json_object"}
-            )
-            
-            result = json.loads(response.choices[0].message.content)
+            result = self._complete_intent(messages)
             
             # If it's a balance check without an address, use the user's address
             if result['operation_type'] == 'balance' and (
@@ -567,7 +2289,7 @@ class BlockchainAgent:
             # Convert addresses to checksum format if present
             if result['operation_type'] == 'balance' and 'address' in result['parameters']:
                 try:
-                    result['parameters']['address'] = self.current_network.w3.to_checksum_address(
+                    result['parameters']['address'] = to_checksum_address(
                         result['parameters']['address']
                     )
                 except Exception:
@@ -575,25 +2297,45 @@ class BlockchainAgent:
                     
             if result['operation_type'] == 'transfer' and 'to_address' in result['parameters']:
                 try:
-                    result['parameters']['to_address'] = self.current_network.w3.to_checksum_address(
+                    result['parameters']['to_address'] = to_checksum_address(
                         result['parameters']['to_address']
                     )
                 except Exception:
                     pass  # Let validation handle invalid addresses
                 
             print(f"{Fore.CYAN}Parsed intent: {result}{Style.RESET_ALL}")
+            self.intent_cache.put(user_message, result)
             return result
             
         except Exception as e:
             print(f"{Fore.RED}Error parsing intent: {str(e)}{Style.RESET_ALL}")
             raise
 
-    def _validate_operation(self, operation_type: str, params: Dict) -> bool:
+    def _complete_intent(self, messages: List[dict]) -> Dict:
+        if self.intent_mode != 'tools':
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                response_format={"type": "json_object"}
+            )
+            return json.loads(response.choices[0].message.content)
+        
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            tools=INTENT_TOOLS,
+            tool_choice="required",
+            parallel_tool_calls=False
+        )
+        call = response.choices[0].message.tool_calls[0].function
+        return {'operation_type': call.name, 'parameters': json.loads(call.arguments)}
+
+    def _validate_operation(self, operation_type: str, params: Dict, reads: Optional[ReadContext] = None) -> bool:
+        reads = reads or ReadContext(self.current_network)
         try:
             if operation_type == "transfer":
                 try:
-                    to_checksum = self.current_network.w3.to_checksum_address(params['to_address'])
-                    from_checksum = self.current_network.w3.to_checksum_address(self.account.address)
+                    to_checksum = to_checksum_address(params['to_address'])
                 except ValueError:
                     print(f"{Fore.YELLOW}Invalid address format{Style.RESET_ALL}")
                     return False
@@ -602,19 +2344,25 @@ class BlockchainAgent:
                     print(f"{Fore.YELLOW}Invalid recipient address format{Style.RESET_ALL}")
                     return False
                     
-                balance = self.current_network.w3.eth.get_balance(from_checksum)
                 wei_amount = self.current_network.w3.to_wei(params['amount'], 'ether')
+                available = self._run(self.signers.available(reads))
+                signer = self._run(self.signers.select(reads, wei_amount))
+                balance = available[signer.address] if signer else max(available.values())
                 
                 print(f"{Fore.CYAN}Validation:{Style.RESET_ALL}")
                 print(f"├─ Current Balance: {self.current_network.w3.from_wei(balance, 'ether')} ETH")
                 print(f"└─ Required Amount: {params['amount']} ETH")
                 
-                return balance >= wei_amount
+                return signer is not None
+                
+            elif operation_type == "bulk_balance":
+                # Addresses are checked by BulkBalanceOperation.validate without any RPC
+                return bool(params.get('addresses'))
                 
             elif operation_type == "balance":
                 try:
                     address = params.get('address', self.account.address)
-                    checksum_address = self.current_network.w3.to_checksum_address(address)
+                    checksum_address = to_checksum_address(address)
                     if not self.current_network.w3.is_address(checksum_address):
                         print(f"{Fore.YELLOW}Invalid address format{Style.RESET_ALL}")
                         return False
@@ -629,53 +2377,41 @@ class BlockchainAgent:
             return False
 
     def process_message(self, user_message: str) -> str:
+        with latency_stats.span('process_message'):
+            return self._process_message(user_message)
+
+    def _process_message(self, user_message: str) -> str:
         try:
-            lower_message = user_message.lower()
-            
-            # Handle direct balance commands
-            if lower_message in ['balance', 'check my balance', "what's my balance", 'whats my balance']:
-                result = self._execute_operation('balance', {'address': self.account.address})
-                return "Balance check completed."
-            
-            # Handle checking balance of a specific address directly
-            if 'balance of ' in lower_message and '0x' in lower_message:
-                address = lower_message.split('0x')[1][:40]
-                address = f"0x{address}"
-                try:
-                    # Convert to checksum address before validation
-                    checksum_address = self.current_network.w3.to_checksum_address(address)
-                    result = self._execute_operation('balance', {'address': checksum_address})
-                    return "Balance check completed."
-                except ValueError:
-                    return f"{Fore.RED}Invalid Ethereum address format.{Style.RESET_ALL}"
-            
-            # Handle Fusion+ commands
-            if any(x in lower_message for x in ['fusion', 'bridge usdc', 'fusion+']):
-                # Extract amount from message
-                words = lower_message.split()
-                for i, word in enumerate(words):
-                    try:
-                        amount = float(word)
-                        result = self._execute_operation('fusion', {'amount': amount})
-                        return f"{Fore.GREEN}Fusion+ swap initiated successfully.{Style.RESET_ALL}"
-                    except ValueError:
-                        continue
-                return f"{Fore.RED}Please specify the USDC amount to swap.{Style.RESET_ALL}"
+            with latency_stats.span('intent_parse'):
+                intent = self._fast_parse_intent(user_message)
+                
+                if intent is None:
+                    if any(x in user_message.lower() for x in FUSION_KEYWORDS):
+                        return f"{Fore.RED}Please specify the USDC amount to swap.{Style.RESET_ALL}"
+                    # For other commands, use GPT to parse intent
+                    intent = self._parse_intent(user_message)
             
-            # For other commands, use GPT to parse intent
-            intent = self._parse_intent(user_message)
+            # Fusion+ validates its USDC balance itself
+            if intent['operation_type'] == 'fusion':
+                if self._execute_operation('fusion', intent['parameters']) is None:
+                    return f"{Fore.CYAN}Fusion+ swap is waiting for approval; it will start once approved.{Style.RESET_ALL}"
+                return f"{Fore.GREEN}Fusion+ swap initiated successfully.{Style.RESET_ALL}"
             
-            if not self._validate_operation(intent['operation_type'], intent['parameters']):
+            # One read context per request: validation and execution share every chain read
+            reads = ReadContext(self.current_network, self.pin_reads)
+            with latency_stats.span('validation'):
+                valid = self._validate_operation(intent['operation_type'], intent['parameters'], reads)
+            if not valid:
                 return f"{Fore.RED}Operation validation failed. Please check parameters and try again.{Style.RESET_ALL}"
             
-            result = self._execute_operation(intent['operation_type'], intent['parameters'])
+            result = self._execute_operation(intent['operation_type'], intent['parameters'], reads)
             
-            if intent['operation_type'] == 'transfer':
-                return f"{Fore.GREEN}Transfer completed successfully.{Style.RESET_ALL}"
-            elif intent['operation_type'] == 'balance':
+            if intent['operation_type'] == 'transfer' and result is None:
+                return f"{Fore.CYAN}Transfer is waiting for approval; it will be sent once approved.{Style.RESET_ALL}"
+            elif intent['operation_type'] == 'transfer':
+                return f"{Fore.GREEN}Transfer submitted. You'll be notified when it confirms.{Style.RESET_ALL}"
+            elif intent['operation_type'] in ('balance', 'bulk_balance'):
                 return "Balance check completed."
-            elif intent['operation_type'] == 'fusion':
-                return f"{Fore.GREEN}Fusion+ swap initiated successfully.{Style.RESET_ALL}"
                 
         except Exception as e:
             return f"{Fore.RED}Error processing request: {str(e)}{Style.RESET_ALL}"
@@ -693,6 +2429,30 @@ class BlockchainAgent:
             )
         }
 
+    async def _probe_networks(self):
+        networks = list(self.networks.values())
+        results = await asyncio.gather(*[network.probe(self.probe_timeout) for network in networks])
+        for network, healthy in zip(networks, results):
+            if healthy:
+                print(f"{Fore.GREEN}✓ Connected to {network.network_name}{Style.RESET_ALL}")
+            else:
+                print(f"{Fore.RED}✗ Failed to connect to {network.network_name}{Style.RESET_ALL}")
+
+    def network_health(self) -> Dict[str, dict]:
+        return {name: network.health() for name, network in self.networks.items()}
+
+    def _show_network_health(self):
+        print(f"\n{Fore.CYAN}Networks:{Style.RESET_ALL}")
+        for name, health in self.network_health().items():
+            status = {True: f"{Fore.GREEN}up", False: f"{Fore.RED}down", None: f"{Fore.YELLOW}not checked"}[health['healthy']]
+            print(f"{name}: {status}{Style.RESET_ALL}")
+            for i, endpoint in enumerate(health['endpoints']):
+                branch = '└─' if i == len(health['endpoints']) - 1 else '├─'
+                latency = f"{endpoint['latency_ms']} ms" if endpoint['latency_ms'] is not None else 'n/a'
+                marker = ' (writes)' if endpoint['writes'] else ''
+                print(f"{branch} {endpoint['url']}: {latency}, error rate {endpoint['error_rate']}"
+                      f"{'' if endpoint['healthy'] else ' [cooling down]'}{marker}")
+
     def set_network(self, network_name: str) -> None:
         if network_name not in self.networks:
             raise ValueError(f"Network {network_name} not found. Available networks: {list(self.networks.keys())}")
@@ -718,8 +2478,43 @@ class BlockchainAgent:
                     self._print_help()
                     continue
                     
-                if user_input.lower() == 'history':
-                    self._show_transaction_history()
+                if user_input.lower() == 'networks':
+                    self._show_network_health()
+                    continue
+                
+                if user_input.lower() == 'signers':
+                    self._show_signers()
+                    continue
+                
+                if user_input.lower() == 'rebalance':
+                    self.rebalance_signers()
+                    continue
+                
+                if user_input.lower() == 'approvals':
+                    self._show_pending_approvals()
+                    continue
+                
+                if user_input.lower().split()[0] == 'stats':
+                    self._show_latency_stats(user_input[5:].strip() or None)
+                    continue
+                
+                if user_input.lower().split()[0] == 'history':
+                    self._show_transaction_history(**self._parse_history_command(user_input))
+                    continue
+                
+                if user_input.lower().startswith('balances ') and os.path.isfile(user_input[9:].strip()):
+                    addresses = self._load_address_file(user_input[9:].strip())
+                    self._execute_operation('bulk_balance', {'addresses': addresses})
+                    print(f"{Fore.BLUE}Agent:{Style.RESET_ALL} Balance check completed.")
+                    continue
+                
+                if user_input.lower().startswith('batch '):
+                    results = self.batch_transfer(self._load_batch_file(user_input[6:].strip()))
+                    if results is None:
+                        print(f"{Fore.BLUE}Agent:{Style.RESET_ALL} {Fore.CYAN}Batch transfer is waiting for approval; it will be sent once approved.{Style.RESET_ALL}")
+                        continue
+                    sent = sum(1 for entry in results if 'error' not in entry)
+                    print(f"{Fore.BLUE}Agent:{Style.RESET_ALL} {Fore.GREEN}Batch transfer submitted: {sent}/{len(results)} sent.{Style.RESET_ALL}")
                     continue
                 
                 response = self.process_message(user_input)
@@ -731,6 +2526,8 @@ class BlockchainAgent:
             except Exception as e:
                 print(f"{Fore.RED}Error:{Style.RESET_ALL} {str(e)}")
 
+        self.close()
+
 if __name__ == "__main__":
     agent = BlockchainAgent()
     agent.chat()
\ No newline at end of file
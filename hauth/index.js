@@ -5,6 +5,7 @@ const speakeasy = require("speakeasy");
 const qrcode = require("qrcode");
 const cors = require("cors");
 const { ethers } = require("ethers");
+const crypto = require("crypto");
 const {
   validateAndFormatThreshold,
   formatWeiValue,
@@ -66,6 +67,46 @@ const defaultSettings = {
 };
 
 const FUSION_THRESHOLD = "0.5"; // Default threshold in USDC demo purposes
+const APPROVAL_TIMEOUT_MS = 300000;
+const MAX_LONG_POLL_MS = 30000;
+
+// Returns the response for a decided (or expired) approval, or null while it is still pending
+function approvalDecision(approval) {
+  if (approval.status === "pending") {
+    if (Date.now() - approval.timestamp <= APPROVAL_TIMEOUT_MS) {
+      return null;
+    }
+    return {
+      approved: false,
+      used2FA: false,
+      required2FA: approval.required2FA,
+      reason: "Approval timeout",
+    };
+  }
+  return {
+    approved: approval.status === "approved",
+    used2FA: approval.used2FA || false,
+    required2FA: approval.required2FA,
+  };
+}
+
+// Resolves with the decision, or null if the approval is still pending after waitMs
+function waitForDecision(approvalId, waitMs) {
+  return new Promise((resolve) => {
+    const started = Date.now();
+    const checkInterval = setInterval(() => {
+      const approval = pendingApprovals.get(approvalId);
+      const decision = approval
+        ? approvalDecision(approval)
+        : { approved: false, used2FA: false, required2FA: false, reason: "Approval timeout" };
+
+      if (decision || Date.now() - started >= waitMs) {
+        clearInterval(checkInterval);
+        resolve(decision);
+      }
+    }, 1000);
+  });
+}
 
 bot.setMyCommands([
   { command: "start", description: "🚀 Start" },
@@ -654,8 +695,9 @@ bot.on("callback_query", async (callbackQuery) => {
     const approvalId = data.split("_")[1];
     const approval = pendingApprovals.get(approvalId);
 
-    if (!approval) {
-      logger.warn(`Attempted to process non-existent approval: ${approvalId}`);
+    // Decided and timed-out approvals stay in the map until the sweep; a late tap must not flip them
+    if (!approval || approvalDecision(approval)) {
+      logger.warn(`Attempted to process non-existent or decided approval: ${approvalId}`);
       await bot.sendMessage(
         chatId,
         "❌ This approval request has expired or was already processed.",
@@ -680,6 +722,16 @@ bot.on("callback_query", async (callbackQuery) => {
       bot.once("message", async (msg) => {
         if (msg.chat.id !== chatId) return;
 
+        // The code may arrive after the approval timed out and the agent was told so
+        if (approvalDecision(approval)) {
+          await bot.sendMessage(
+            chatId,
+            "❌ This approval request has expired or was already processed.",
+            { parse_mode: "Markdown" }
+          );
+          return;
+        }
+
         const code = msg.text;
         const verified = speakeasy.totp.verify({
           secret: settings.secret,
@@ -776,7 +828,7 @@ app.post("/api/request-approval", async (req, res) => {
     const settings = agentSettings.get(agentAddress);
     const has2FAEnabled = settings?.isSetup2FA || false;
 
-    const approvalId = Date.now().toString();
+    const approvalId = crypto.randomUUID();
     logger.info(
       `Created approval request ${approvalId} for agent ${agentAddress}`
     );
@@ -787,6 +839,7 @@ app.post("/api/request-approval", async (req, res) => {
       status: "pending",
       timestamp: Date.now(),
       used2FA: false, // Track if 2FA was used in approval
+      required2FA: has2FAEnabled,
     });
 
     // Rest of your existing message construction code...
@@ -798,6 +851,23 @@ app.post("/api/request-approval", async (req, res) => {
       "gwei"
     );
 
+    // Batch approvals list each recipient; Telegram caps messages at 4096 chars
+    const MAX_LISTED_RECIPIENTS = 40;
+    const recipients = Array.isArray(transaction.recipients)
+      ? transaction.recipients
+      : [];
+    const recipientLines = recipients
+      .slice(0, MAX_LISTED_RECIPIENTS)
+      .map((r) => `  ◦ \`${r.to}\`: ${ethers.formatEther(r.value)} ETH`);
+    if (recipients.length > MAX_LISTED_RECIPIENTS) {
+      recipientLines.push(
+        `  ◦ …and ${recipients.length - MAX_LISTED_RECIPIENTS} more`
+      );
+    }
+    const recipientList = recipientLines.length
+      ? `\n${recipientLines.join("\n")}`
+      : "";
+
     const valueExceeded =
       BigInt(transaction.value) > BigInt(onChainConfig.valueThreshold);
     const gasExceeded =
@@ -808,7 +878,7 @@ app.post("/api/request-approval", async (req, res) => {
 *AI Agent:* \`${agentAddress}\`
 
 *Transaction Details:*
-• To: \`${transaction.to}\`
+• To: \`${transaction.to}\`${recipientList}
 • Value: ${valueInEth} ETH ${valueExceeded ? "⚠️" : ""}
 • Gas Price: ${gasInGwei} Gwei ${gasExceeded ? "⚠️" : ""}
 
@@ -834,40 +904,21 @@ Do you approve this transaction?`;
       },
     });
 
-    return new Promise((resolve) => {
-      const checkInterval = setInterval(() => {
-        const approval = pendingApprovals.get(approvalId);
-
-        if (Date.now() - approval.timestamp > 300000) {
-          logger.warn(`Approval request ${approvalId} timed out`);
-          clearInterval(checkInterval);
-          pendingApprovals.delete(approvalId);
-          resolve(
-            res.json({
-              approved: false,
-              used2FA: false,
-              required2FA: has2FAEnabled,
-              reason: "Approval timeout",
-            })
-          );
-        }
+    // Async clients get a handle right away and long-poll /api/approval/:approvalId
+    if (req.body.async) {
+      return res.json({ pending: true, approvalId });
+    }
 
-        if (approval.status !== "pending") {
-          logger.info(
-            `Approval request ${approvalId} completed with status: ${approval.status}`
-          );
-          clearInterval(checkInterval);
-          pendingApprovals.delete(approvalId);
-          resolve(
-            res.json({
-              approved: approval.status === "approved",
-              used2FA: approval.used2FA || false,
-              required2FA: has2FAEnabled,
-            })
-          );
-        }
-      }, 1000);
-    });
+    const decision = await waitForDecision(approvalId, APPROVAL_TIMEOUT_MS);
+    pendingApprovals.delete(approvalId);
+    if (decision.reason) {
+      logger.warn(`Approval request ${approvalId} timed out`);
+    } else {
+      logger.info(
+        `Approval request ${approvalId} completed: ${decision.approved ? "approved" : "rejected"}`
+      );
+    }
+    return res.json(decision);
   } catch (error) {
     console.error("Error processing approval request:", error);
     logger.error(`Error processing approval request: ${error.message}`);
@@ -902,7 +953,7 @@ app.post("/api/request-fusion-approval", async (req, res) => {
       });
     }
 
-    const approvalId = Date.now().toString();
+    const approvalId = crypto.randomUUID();
     logger.info(
       `Created fusion approval request ${approvalId} for agent ${agentAddress}`
     );
@@ -914,6 +965,7 @@ app.post("/api/request-fusion-approval", async (req, res) => {
       status: "pending",
       timestamp: Date.now(),
       used2FA: false,
+      required2FA: has2FAEnabled,
     });
 
     const message = `🚨 *High Value Fusion+ Swap Detected!*
@@ -948,37 +1000,14 @@ Do you approve this swap?`;
       },
     });
 
-    // Use the same approval checking logic as the existing endpoint
-    return new Promise((resolve) => {
-      const checkInterval = setInterval(() => {
-        const approval = pendingApprovals.get(approvalId);
-
-        if (Date.now() - approval.timestamp > 300000) {
-          clearInterval(checkInterval);
-          pendingApprovals.delete(approvalId);
-          resolve(
-            res.json({
-              approved: false,
-              used2FA: false,
-              required2FA: has2FAEnabled,
-              reason: "Approval timeout",
-            })
-          );
-        }
+    if (req.body.async) {
+      return res.json({ pending: true, approvalId });
+    }
 
-        if (approval.status !== "pending") {
-          clearInterval(checkInterval);
-          pendingApprovals.delete(approvalId);
-          resolve(
-            res.json({
-              approved: approval.status === "approved",
-              used2FA: approval.used2FA || false,
-              required2FA: has2FAEnabled,
-            })
-          );
-        }
-      }, 1000);
-    });
+    // Use the same approval checking logic as the existing endpoint
+    const decision = await waitForDecision(approvalId, APPROVAL_TIMEOUT_MS);
+    pendingApprovals.delete(approvalId);
+    return res.json(decision);
   } catch (error) {
     console.error("Error processing fusion approval request:", error);
     logger.error(`Error processing fusion approval request: ${error.message}`);
@@ -989,6 +1018,33 @@ Do you approve this swap?`;
   }
 });
 
+// Long-poll for the decision on an approval registered with `async: true`
+app.get("/api/approval/:approvalId", async (req, res) => {
+  const { approvalId } = req.params;
+  if (!pendingApprovals.has(approvalId)) {
+    return res.status(404).json({ error: "Approval not found" });
+  }
+
+  const waitMs = Math.min(
+    parseInt(req.query.wait || "0", 10) * 1000 || 0,
+    MAX_LONG_POLL_MS
+  );
+  const approval = pendingApprovals.get(approvalId);
+  const decision =
+    approvalDecision(approval) ||
+    (waitMs > 0 ? await waitForDecision(approvalId, waitMs) : null);
+
+  if (!decision) {
+    return res.json({ pending: true, approvalId });
+  }
+
+  // Kept until the sweep so a client whose response was lost can poll again and get the same decision
+  logger.info(
+    `Approval request ${approvalId} delivered: ${decision.reason || (decision.approved ? "approved" : "rejected")}`
+  );
+  return res.json(decision);
+});
+
 const PORT = process.env.PORT || 3000;
 app.listen(PORT, () => {
   logger.info(`Server started on port ${PORT}`);
@@ -999,7 +1055,8 @@ app.listen(PORT, () => {
 setInterval(() => {
   const now = Date.now();
   for (const [id, approval] of pendingApprovals.entries()) {
-    if (now - approval.timestamp > 300000) {
+    // Keep decisions around long enough for a reconnecting client to fetch them again
+    if (now - approval.timestamp > 2 * APPROVAL_TIMEOUT_MS) {
       pendingApprovals.delete(id);
     }
   }
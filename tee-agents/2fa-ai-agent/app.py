@@ -1,5 +1,6 @@
 import os
-from dstack_sdk import AsyncTappdClient, DeriveKeyResponse, TdxQuoteResponse
+import asyncio
+from dstack_sdk import AsyncTappdClient, TappdClient, DeriveKeyResponse, TdxQuoteResponse
 from fastapi import FastAPI, Query
 from cryptography.hazmat.primitives.asymmetric.ec import derive_private_key, SECP256K1
 from cryptography.hazmat.primitives.asymmetric import ec
@@ -13,48 +14,66 @@ from dotenv import load_dotenv
 load_dotenv()
 app = FastAPI()
 
-@app.get("/derivekey")
-async def derivekey():
-    # Initialize client
-    client = AsyncTappdClient()
-    
-    # Derive the key using the client's method
-    deriveKey = await client.derive_key('/test', 'test')
-    assert isinstance(deriveKey, DeriveKeyResponse)
-    
-    # Convert to bytes
-    asBytes = deriveKey.toBytes()
-    assert isinstance(asBytes, bytes)
-    
+# One Tappd client per app (plus a blocking one for import-time startup code);
+# derived key material is held in memory only, per (path, subject)
+tappd_client = AsyncTappdClient()
+tappd_sync_client = TappdClient()
+# Key paths /derivekey may derive (comma-separated); only these and the signer's ever reach the cache
+DERIVEKEY_PATHS = [path.strip() for path in os.getenv('DERIVEKEY_PATHS', '/test').split(',') if path.strip()]
+derived_keys = {}
+# In-flight derivations, so concurrent requests for the same key share one call to the dstack socket
+derived_key_tasks = {}
+
+def eth_key_material(deriveKey: DeriveKeyResponse) -> dict:
     # Limit to 32 bytes for private key
     limitedSize = deriveKey.toBytes(32)
     
-    # Convert the private key bytes to an integer
-    private_key_int = int.from_bytes(limitedSize, byteorder="big")
-    
-    # Generate the private key object
-    private_key = ec.derive_private_key(private_key_int, SECP256K1())
-    
-    # Derive the public key from the private key
-    public_key = private_key.public_key()
-    public_key_bytes = public_key.public_bytes(
+    # Generate the private key object and derive the public key from it
+    private_key = ec.derive_private_key(int.from_bytes(limitedSize, byteorder="big"), SECP256K1())
+    public_key_bytes = private_key.public_key().public_bytes(
         encoding=serialization.Encoding.X962,
         format=serialization.PublicFormat.UncompressedPoint
     )
     
     # Compute Ethereum address (Keccak-256 hash of public key, last 20 bytes)
-    eth_address = keccak(public_key_bytes[1:])[-20:]
-    
     return {
-        "private": limitedSize.hex(),
-        "address": eth_address.hex()
+        "private_key": limitedSize,
+        "address": keccak(public_key_bytes[1:])[-20:]
     }
 
+async def derive_eth_key(path: str, subject: str) -> dict:
+    """Derive an Ethereum key once per (path, subject); concurrent callers await the same derivation."""
+    key = (path, subject)
+    if key in derived_keys:
+        return derived_keys[key]
+    task = derived_key_tasks.get(key)
+    if task is None:
+        task = derived_key_tasks[key] = asyncio.ensure_future(tappd_client.derive_key(path, subject))
+        task.add_done_callback(lambda _: derived_key_tasks.pop(key, None))
+    # shield: one caller disconnecting must not cancel the derivation for the others
+    deriveKey = await asyncio.shield(task)
+    assert isinstance(deriveKey, DeriveKeyResponse)
+    return derived_keys.setdefault(key, eth_key_material(deriveKey))
+
+def derive_eth_key_sync(path: str, subject: str) -> dict:
+    """Blocking derive_eth_key for startup code; fills the same cache."""
+    key = (path, subject)
+    if key not in derived_keys:
+        derived_keys[key] = eth_key_material(tappd_sync_client.derive_key(path, subject))
+    return derived_keys[key]
+
+@app.get("/derivekey")
+async def derivekey(path: str = Query('/test')):
+    # Only the address is served; the agent's signing key path is never derivable here
+    if path not in DERIVEKEY_PATHS or path == os.getenv('SIGNER_KEY_PATH'):
+        return JSONResponse(content={"error": "Key path not allowed"}, status_code=403)
+    derived = await derive_eth_key(path, 'test')
+    return {"address": derived["address"].hex()}
+
     
 @app.get("/tdxquote")
 async def tdxquote():
-    client = AsyncTappdClient()
-    tdxQuote = await client.tdx_quote('test')
+    tdxQuote = await tappd_client.tdx_quote('test')
     assert isinstance(tdxQuote, TdxQuoteResponse)
     return {"tdxQuote": tdxQuote}
 
@@ -65,33 +84,117 @@ import json
 from abc import ABC, abstractmethod
 from datetime import datetime
 import time
+import threading
+import secrets
+import contextvars
+from collections import OrderedDict, deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+import weakref
+import copy
 import requests
 from openai import OpenAI
 from web3 import Web3
 from eth_account import Account
 from fastapi import FastAPI, Query, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from jinja2 import Environment, FileSystemLoader
 
-app = FastAPI()
-
 # Set up Jinja2 environment for templates
 templates = Environment(loader=FileSystemLoader("templates"))
 
-# Initialize chat_history as a list of message objects
-chat_history = []
-
 load_dotenv()
 
+# Chat history is kept per browser session (identified by a cookie) in a bounded buffer; messages are
+# numbered by seq so clients can fetch only what is new
+CHAT_HISTORY_MAX_MESSAGES = int(os.getenv('CHAT_HISTORY_MAX_MESSAGES', '500'))
+CHAT_MAX_SESSIONS = int(os.getenv('CHAT_MAX_SESSIONS', '100'))
+SESSION_COOKIE = 'session_id'
+
+class ChatSession:
+    def __init__(self, max_messages: int):
+        self.messages = deque(maxlen=max_messages)
+        self.seq = 0
+        # New for every buffer, so cursors from before a restart or eviction can be told apart
+        self.epoch = secrets.token_hex(8)
+        # (loop, event) pairs of open /chat-stream connections, woken on every append
+        self.waiters = set()
+
+    def append(self, sender, message, message_type='message'):
+        self.seq += 1
+        self.messages.append({
+            'seq': self.seq,
+            'sender': sender,
+            'message': message,
+            'type': message_type
+        })
+
+chat_sessions = OrderedDict()
+chat_history_lock = threading.Lock()
+# Messages logged outside any request (startup, network connections); every new session starts with a copy
+startup_history = deque(maxlen=CHAT_HISTORY_MAX_MESSAGES)
+current_session_id = contextvars.ContextVar('current_session_id', default=None)
+
+def get_chat_session(session_id):
+    """Return the session's buffer, creating it and evicting the least recently used idle sessions. Hold chat_history_lock."""
+    session = chat_sessions.get(session_id)
+    if session is None:
+        session = chat_sessions[session_id] = ChatSession(CHAT_HISTORY_MAX_MESSAGES)
+        for msg in startup_history:
+            session.append(msg['sender'], msg['message'], msg['type'])
+    chat_sessions.move_to_end(session_id)
+    if len(chat_sessions) > CHAT_MAX_SESSIONS:
+        # Sessions with an open stream are never evicted
+        idle = [sid for sid, s in chat_sessions.items() if not s.waiters and sid != session_id]
+        for sid in idle[:len(chat_sessions) - CHAT_MAX_SESSIONS]:
+            del chat_sessions[sid]
+    return session
+
 def append_to_chat_history(sender, message, message_type='message'):
-    global chat_history
-    chat_history.append({
-        'sender': sender,
-        'message': message,
-        'type': message_type
-    })
+    session_id = current_session_id.get()
+    with chat_history_lock:
+        if session_id is None:
+            startup_history.append({'sender': sender, 'message': message, 'type': message_type})
+            return
+        session = get_chat_session(session_id)
+        session.append(sender, message, message_type)
+        waiters = list(session.waiters)
+    for loop, event in waiters:
+        loop.call_soon_threadsafe(event.set)
+
+def chat_history_since(session_id, since, epoch=None):
+    """(epoch, messages with seq greater than since, reset) for the session; seqs are contiguous so this is a slice.
+
+    reset is True when the cursor belongs to an earlier buffer; the whole buffer is returned then.
+    """
+    with chat_history_lock:
+        session = get_chat_session(session_id)
+        reset = (epoch is not None and epoch != session.epoch) or since > session.seq
+        if reset:
+            since = 0
+        messages = session.messages
+        start = max(since - messages[0]['seq'] + 1, 0) if messages else 0
+        return session.epoch, list(islice(messages, start, None)), reset
+
+# Agent calls block on Web3, OpenAI and approvals for minutes, so they run on a bounded worker pool,
+# one at a time per session
+CHAT_WORKERS = int(os.getenv('CHAT_WORKERS', '8'))
+chat_executor = ThreadPoolExecutor(max_workers=CHAT_WORKERS, thread_name_prefix='chat')
+session_locks = weakref.WeakValueDictionary()
+nonce_lock = threading.Lock()
+
+async def run_in_session(func, *args):
+    """Run a blocking agent call on the worker pool after the session's previous call has finished."""
+    session_id = current_session_id.get()
+    lock = session_locks.get(session_id)
+    if lock is None:
+        lock = session_locks[session_id] = asyncio.Lock()
+    async with lock:
+        # copy_context keeps current_session_id set so messages land in the right session
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(chat_executor, context.run, func, *args)
 
 class BlockchainNetwork:
     def __init__(self, network_name: str, rpc_url: str, chain_id: int):
@@ -181,7 +284,6 @@ class TransferOperation(Operation):
             from_checksum = self.w3.to_checksum_address(from_address)
             to_checksum = self.w3.to_checksum_address(to_address)
             
-            nonce = self.w3.eth.get_transaction_count(from_checksum)
             wei_amount = self.w3.to_wei(amount, 'ether')
             
             max_priority_fee = self.w3.eth.max_priority_fee
@@ -191,7 +293,6 @@ class TransferOperation(Operation):
                 'from': from_checksum,
                 'to': to_checksum,
                 'value': wei_amount,
-                'nonce': nonce,
                 'gas': 21000,
                 'maxFeePerGas': max_fee,
                 'maxPriorityFeePerGas': max_priority_fee,
@@ -228,8 +329,11 @@ class TransferOperation(Operation):
                 append_to_chat_history('system', "• Consider using 2FA for enhanced security on high-value transactions")
                 append_to_chat_history('system', "• You can configure 2FA settings in the Telegram bot")
             
-            signed = self.w3.eth.account.sign_transaction(transaction, private_key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed.raw_transaction)
+            # Other sessions may be sending from the same account; take the nonce only once approved
+            with nonce_lock:
+                transaction['nonce'] = self.w3.eth.get_transaction_count(from_checksum, 'pending')
+                signed = self.w3.eth.account.sign_transaction(transaction, private_key)
+                tx_hash = self.w3.eth.send_raw_transaction(signed.raw_transaction)
             
             return self.w3.eth.wait_for_transaction_receipt(tx_hash)
         except Exception as e:
@@ -260,7 +364,7 @@ class BalanceOperation(Operation):
             raise
 
 class BlockchainAgent:
-    def __init__(self, model: str = "gpt-4-1106-preview"):
+    def __init__(self, model: str = "gpt-4-1106-preview", private_key: Optional[str] = None):
         self._print_welcome_banner()
         append_to_chat_history('system', "Initializing blockchain connection...")
         
@@ -268,7 +372,7 @@ class BlockchainAgent:
         self.model = model
         self.networks = self._initialize_networks()
         self.current_network = None
-        self.private_key = os.getenv('PRIVATE_KEY')
+        self.private_key = private_key or os.getenv('PRIVATE_KEY')
         self.account = Account.from_key(self.private_key)
         self.transaction_history = []
         
@@ -335,6 +439,7 @@ Available Commands:
 ├─ send X ETH to ADDRESS - Send ETH to an address
 ├─ help - Show this help message
 ├─ history - Show transaction history
+├─ network NAME - Switch network for this session
 └─ exit - Exit the program
 """
         append_to_chat_history('system', help_text, message_type='meta')
@@ -543,9 +648,51 @@ Available Commands:
             raise ValueError(f"Network {network_name} not found. Available networks: {list(self.networks.keys())}")
         self.current_network = self.networks[network_name]
 
-agent = BlockchainAgent()
+    def fork(self) -> 'BlockchainAgent':
+        """Agent for one session: shares the OpenAI client, networks and account, keeps its own history and network."""
+        session_agent = copy.copy(self)
+        session_agent.transaction_history = []
+        return session_agent
+
+# With SIGNER_KEY_PATH set the agent signs with a key derived inside the TEE instead of PRIVATE_KEY
+signer_key = None
+if os.getenv('SIGNER_KEY_PATH'):
+    derived = derive_eth_key_sync(os.getenv('SIGNER_KEY_PATH'), os.getenv('SIGNER_KEY_SUBJECT', ''))
+    signer_key = '0x' + derived['private_key'].hex()
+
+agent = BlockchainAgent(private_key=signer_key)
 agent.set_network('base-sepolia')
 
+# Per-session agents keyed by the session cookie, least recently used first
+AGENT_MAX_SESSIONS = int(os.getenv('AGENT_MAX_SESSIONS', str(CHAT_MAX_SESSIONS)))
+session_agents = OrderedDict()
+session_agents_lock = threading.Lock()
+
+def get_session_agent() -> BlockchainAgent:
+    """Agent of the calling session, forked from the shared one on first use; evicts the least recently used."""
+    session_id = current_session_id.get()
+    with session_agents_lock:
+        session_agent = session_agents.get(session_id)
+        if session_agent is None:
+            session_agent = session_agents[session_id] = agent.fork()
+        session_agents.move_to_end(session_id)
+        while len(session_agents) > AGENT_MAX_SESSIONS:
+            session_agents.popitem(last=False)
+    return session_agent
+
+@app.middleware("http")
+async def chat_session(request: Request, call_next):
+    """Bind the request to its chat session, issuing a session cookie on first visit."""
+    session_id = request.cookies.get(SESSION_COOKIE) or secrets.token_urlsafe(16)
+    token = current_session_id.set(session_id)
+    try:
+        response = await call_next(request)
+    finally:
+        current_session_id.reset(token)
+    if request.cookies.get(SESSION_COOKIE) != session_id:
+        response.set_cookie(SESSION_COOKIE, session_id, httponly=True, samesite='strict')
+    return response
+
 # Serve static files (if any)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -554,15 +701,56 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 async def get_chat_page():
     return FileResponse('templates/chat.html')
 
-# Endpoint to get chat history (used by the frontend)
+# Endpoint to get chat history; pass since=<seq> to get only newer messages
 @app.get("/chat-history")
-async def get_chat_history():
-    global chat_history
-    return {"chatHistory": chat_history}
+async def get_chat_history(since: int = Query(0, description="Return messages after this seq"),
+                           epoch: Optional[str] = Query(None, description="Epoch the since cursor belongs to")):
+    epoch, messages, reset = chat_history_since(current_session_id.get(), since, epoch)
+    last_seq = messages[-1]['seq'] if messages else (0 if reset else since)
+    return {"chatHistory": messages, "lastSeq": last_seq, "epoch": epoch, "reset": reset}
+
+# Server-Sent Events stream of new chat messages (used by the frontend)
+@app.get("/chat-stream")
+async def chat_stream(request: Request, since: int = Query(0, description="Stream messages after this seq"),
+                      epoch: Optional[str] = Query(None, description="Epoch the since cursor belongs to")):
+    # EventSource reconnects with the id of the last event it saw, "<epoch>:<seq>"
+    cursor = since
+    last_event_id = request.headers.get('last-event-id')
+    if last_event_id is not None:
+        epoch, _, seq = last_event_id.partition(':')
+        cursor = int(seq) if seq.isdigit() else 0
+    session_id = current_session_id.get()
+
+    async def events():
+        nonlocal cursor, epoch
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with chat_history_lock:
+            get_chat_session(session_id).waiters.add(waiter)
+        try:
+            while not await request.is_disconnected():
+                waiter[1].clear()
+                epoch, messages, reset = chat_history_since(session_id, cursor, epoch)
+                if reset:
+                    # The buffer was recreated; the client clears its view and takes the new messages from seq 1
+                    cursor = 0
+                    yield f"event: reset\ndata: {json.dumps({'epoch': epoch})}\n\n"
+                for msg in messages:
+                    cursor = msg['seq']
+                    yield f"id: {epoch}:{cursor}\ndata: {json.dumps(msg)}\n\n"
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            with chat_history_lock:
+                session = chat_sessions.get(session_id)
+                if session:
+                    session.waiters.discard(waiter)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 @app.get("/chat")
 async def chat(text: str = Query(..., description="User input text")):
-    global chat_history
     try:
         if not text.strip():
             return JSONResponse(content={"error": "Text cannot be empty"}, status_code=400)
@@ -571,18 +759,28 @@ async def chat(text: str = Query(..., description="User input text")):
         if text.lower() == "exit":
             append_to_chat_history('system', "Goodbye!")
             return JSONResponse(content={"message": "Goodbye!"}, status_code=200)
+        session_agent = get_session_agent()
         if text.lower() == "help":
-            agent._print_help()
+            await run_in_session(session_agent._print_help)
             return JSONResponse(content={"status": "ok"})
         if text.lower() == "history":
-            agent._show_transaction_history()
+            await run_in_session(session_agent._show_transaction_history)
+            return JSONResponse(content={"status": "ok"})
+        if text.lower().startswith("network "):
+            network_name = text.split(maxsplit=1)[1].strip().lower()
+            try:
+                # Serialized with the session's other calls so an in-flight operation keeps its network
+                await run_in_session(session_agent.set_network, network_name)
+                append_to_chat_history('system', f"✓ Switched to {network_name}")
+            except ValueError as e:
+                append_to_chat_history('system', str(e))
             return JSONResponse(content={"status": "ok"})
 
         # Append user's message to chat history
         append_to_chat_history('user', text)
 
         # Process the user's message
-        response = agent.process_message(text)
+        response = await run_in_session(session_agent.process_message, text)
 
         # Append agent's response to chat history
         append_to_chat_history('agent', response)
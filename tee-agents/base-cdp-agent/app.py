@@ -1,7 +1,12 @@
 import os
 import sys
 import time
+import asyncio
 import threading
+import secrets
+import contextvars
+from collections import OrderedDict, deque
+from itertools import islice
 from typing import Dict, List, Optional, Union
 from dotenv import load_dotenv
 import json
@@ -10,7 +15,7 @@ import requests
 from web3 import Web3
 from eth_account import Account
 from fastapi import FastAPI, Query, Request
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from jinja2 import Environment, FileSystemLoader
@@ -37,18 +42,78 @@ app = FastAPI()
 # Set up Jinja2 environment for templates
 templates = Environment(loader=FileSystemLoader("templates"))
 
-# Initialize chat_history as a list of message objects
-chat_history = []
-
 load_dotenv()
 
+# Chat history is kept per browser session (identified by a cookie) in a bounded buffer; messages are
+# numbered by seq so clients can fetch only what is new
+CHAT_HISTORY_MAX_MESSAGES = int(os.getenv('CHAT_HISTORY_MAX_MESSAGES', '500'))
+CHAT_MAX_SESSIONS = int(os.getenv('CHAT_MAX_SESSIONS', '100'))
+SESSION_COOKIE = 'session_id'
+
+class ChatSession:
+    def __init__(self, max_messages: int):
+        self.messages = deque(maxlen=max_messages)
+        self.seq = 0
+        # New for every buffer, so cursors from before a restart or eviction can be told apart
+        self.epoch = secrets.token_hex(8)
+        # (loop, event) pairs of open /chat-stream connections, woken on every append
+        self.waiters = set()
+
+    def append(self, sender, message, message_type='message'):
+        self.seq += 1
+        self.messages.append({
+            'seq': self.seq,
+            'sender': sender,
+            'message': message,
+            'type': message_type
+        })
+
+chat_sessions = OrderedDict()
+chat_history_lock = threading.Lock()
+# Messages logged outside any request (startup, network connections); every new session starts with a copy
+startup_history = deque(maxlen=CHAT_HISTORY_MAX_MESSAGES)
+current_session_id = contextvars.ContextVar('current_session_id', default=None)
+
+def get_chat_session(session_id):
+    """Return the session's buffer, creating it and evicting the least recently used idle sessions. Hold chat_history_lock."""
+    session = chat_sessions.get(session_id)
+    if session is None:
+        session = chat_sessions[session_id] = ChatSession(CHAT_HISTORY_MAX_MESSAGES)
+        for msg in startup_history:
+            session.append(msg['sender'], msg['message'], msg['type'])
+    chat_sessions.move_to_end(session_id)
+    if len(chat_sessions) > CHAT_MAX_SESSIONS:
+        # Sessions with an open stream are never evicted
+        idle = [sid for sid, s in chat_sessions.items() if not s.waiters and sid != session_id]
+        for sid in idle[:len(chat_sessions) - CHAT_MAX_SESSIONS]:
+            del chat_sessions[sid]
+    return session
+
 def append_to_chat_history(sender, message, message_type='message'):
-    global chat_history
-    chat_history.append({
-        'sender': sender,
-        'message': message,
-        'type': message_type
-    })
+    session_id = current_session_id.get()
+    with chat_history_lock:
+        if session_id is None:
+            startup_history.append({'sender': sender, 'message': message, 'type': message_type})
+            return
+        session = get_chat_session(session_id)
+        session.append(sender, message, message_type)
+        waiters = list(session.waiters)
+    for loop, event in waiters:
+        loop.call_soon_threadsafe(event.set)
+
+def chat_history_since(session_id, since, epoch=None):
+    """(epoch, messages with seq greater than since, reset) for the session; seqs are contiguous so this is a slice.
+
+    reset is True when the cursor belongs to an earlier buffer; the whole buffer is returned then.
+    """
+    with chat_history_lock:
+        session = get_chat_session(session_id)
+        reset = (epoch is not None and epoch != session.epoch) or since > session.seq
+        if reset:
+            since = 0
+        messages = session.messages
+        start = max(since - messages[0]['seq'] + 1, 0) if messages else 0
+        return session.epoch, list(islice(messages, start, None)), reset
 
 # Configure a file to persist the agent's CDP MPC Wallet Data.
 wallet_data_file = "wallet_data.txt"
@@ -106,6 +171,19 @@ def process_message(text):
         response_text = f"Error processing message: {str(e)}"
     return response_text.strip()
 
+@app.middleware("http")
+async def chat_session(request: Request, call_next):
+    """Bind the request to its chat session, issuing a session cookie on first visit."""
+    session_id = request.cookies.get(SESSION_COOKIE) or secrets.token_urlsafe(16)
+    token = current_session_id.set(session_id)
+    try:
+        response = await call_next(request)
+    finally:
+        current_session_id.reset(token)
+    if request.cookies.get(SESSION_COOKIE) != session_id:
+        response.set_cookie(SESSION_COOKIE, session_id, httponly=True, samesite='strict')
+    return response
+
 # Serve static files (if any)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -114,15 +192,56 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 async def get_chat_page():
     return FileResponse('templates/chat.html')
 
-# Endpoint to get chat history (used by the frontend)
+# Endpoint to get chat history; pass since=<seq> to get only newer messages
 @app.get("/chat-history")
-async def get_chat_history():
-    global chat_history
-    return {"chatHistory": chat_history}
+async def get_chat_history(since: int = Query(0, description="Return messages after this seq"),
+                           epoch: Optional[str] = Query(None, description="Epoch the since cursor belongs to")):
+    epoch, messages, reset = chat_history_since(current_session_id.get(), since, epoch)
+    last_seq = messages[-1]['seq'] if messages else (0 if reset else since)
+    return {"chatHistory": messages, "lastSeq": last_seq, "epoch": epoch, "reset": reset}
+
+# Server-Sent Events stream of new chat messages (used by the frontend)
+@app.get("/chat-stream")
+async def chat_stream(request: Request, since: int = Query(0, description="Stream messages after this seq"),
+                      epoch: Optional[str] = Query(None, description="Epoch the since cursor belongs to")):
+    # EventSource reconnects with the id of the last event it saw, "<epoch>:<seq>"
+    cursor = since
+    last_event_id = request.headers.get('last-event-id')
+    if last_event_id is not None:
+        epoch, _, seq = last_event_id.partition(':')
+        cursor = int(seq) if seq.isdigit() else 0
+    session_id = current_session_id.get()
+
+    async def events():
+        nonlocal cursor, epoch
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with chat_history_lock:
+            get_chat_session(session_id).waiters.add(waiter)
+        try:
+            while not await request.is_disconnected():
+                waiter[1].clear()
+                epoch, messages, reset = chat_history_since(session_id, cursor, epoch)
+                if reset:
+                    # The buffer was recreated; the client clears its view and takes the new messages from seq 1
+                    cursor = 0
+                    yield f"event: reset\ndata: {json.dumps({'epoch': epoch})}\n\n"
+                for msg in messages:
+                    cursor = msg['seq']
+                    yield f"id: {epoch}:{cursor}\ndata: {json.dumps(msg)}\n\n"
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            with chat_history_lock:
+                session = chat_sessions.get(session_id)
+                if session:
+                    session.waiters.discard(waiter)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 @app.get("/chat")
 async def chat(text: str = Query(..., description="User input text")):
-    global chat_history
     try:
         if not text.strip():
             return JSONResponse(content={"error": "Text cannot be empty"}, status_code=400)
@@ -142,48 +261,57 @@ async def chat(text: str = Query(..., description="User input text")):
     except Exception as e:
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
-@app.get("/derivekey")
-async def derivekey():
-    # Initialize client
-    client = AsyncTappdClient()
-    
-    # Derive the key using the client's method
-    deriveKey = await client.derive_key('/test', 'test')
-    assert isinstance(deriveKey, DeriveKeyResponse)
-    
-    # Convert to bytes
-    asBytes = deriveKey.toBytes()
-    assert isinstance(asBytes, bytes)
-    
+# One Tappd client per app; derived key material is held in memory only, per (path, subject)
+tappd_client = AsyncTappdClient()
+# Key paths /derivekey may derive (comma-separated); only these ever reach the cache
+DERIVEKEY_PATHS = [path.strip() for path in os.getenv('DERIVEKEY_PATHS', '/test').split(',') if path.strip()]
+derived_keys = {}
+# In-flight derivations, so concurrent requests for the same key share one call to the dstack socket
+derived_key_tasks = {}
+
+def eth_key_material(deriveKey: DeriveKeyResponse) -> dict:
     # Limit to 32 bytes for private key
     limitedSize = deriveKey.toBytes(32)
     
-    # Convert the private key bytes to an integer
-    private_key_int = int.from_bytes(limitedSize, byteorder="big")
-    
-    # Generate the private key object
-    private_key = ec.derive_private_key(private_key_int, SECP256K1())
-    
-    # Derive the public key from the private key
-    public_key = private_key.public_key()
-    public_key_bytes = public_key.public_bytes(
+    # Generate the private key object and derive the public key from it
+    private_key = ec.derive_private_key(int.from_bytes(limitedSize, byteorder="big"), SECP256K1())
+    public_key_bytes = private_key.public_key().public_bytes(
         encoding=serialization.Encoding.X962,
         format=serialization.PublicFormat.UncompressedPoint
     )
     
     # Compute Ethereum address (Keccak-256 hash of public key, last 20 bytes)
-    eth_address = keccak(public_key_bytes[1:])[-20:]
-    
     return {
-        "private": limitedSize.hex(),
-        "address": eth_address.hex()
+        "private_key": limitedSize,
+        "address": keccak(public_key_bytes[1:])[-20:]
     }
 
+async def derive_eth_key(path: str, subject: str) -> dict:
+    """Derive an Ethereum key once per (path, subject); concurrent callers await the same derivation."""
+    key = (path, subject)
+    if key in derived_keys:
+        return derived_keys[key]
+    task = derived_key_tasks.get(key)
+    if task is None:
+        task = derived_key_tasks[key] = asyncio.ensure_future(tappd_client.derive_key(path, subject))
+        task.add_done_callback(lambda _: derived_key_tasks.pop(key, None))
+    # shield: one caller disconnecting must not cancel the derivation for the others
+    deriveKey = await asyncio.shield(task)
+    assert isinstance(deriveKey, DeriveKeyResponse)
+    return derived_keys.setdefault(key, eth_key_material(deriveKey))
+
+@app.get("/derivekey")
+async def derivekey(path: str = Query('/test')):
+    # Only the address is served, never the key itself
+    if path not in DERIVEKEY_PATHS:
+        return JSONResponse(content={"error": "Key path not allowed"}, status_code=403)
+    derived = await derive_eth_key(path, 'test')
+    return {"address": derived["address"].hex()}
+
     
 @app.get("/tdxquote")
 async def tdxquote():
-    client = AsyncTappdClient()
-    tdxQuote = await client.tdx_quote('test')
+    tdxQuote = await tappd_client.tdx_quote('test')
     assert isinstance(tdxQuote, TdxQuoteResponse)
     return {"tdxQuote": tdxQuote}
 